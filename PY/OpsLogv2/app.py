@@ -12,7 +12,7 @@ from database import (
     create_incident,
     create_tables,
     get_incident,
-    get_user,
+    get_user_profile,
     list_delete_requests,
     list_users,
     request_delete_incident,
@@ -24,11 +24,61 @@ from utils import normalize_text
 
 
 INACTIVITY_MINUTES = 30
+LIST_PAGE_SIZE = 50
+USER_CACHE_TTL_SECONDS = 15
+QUERY_CACHE_TTL_SECONDS = 30
 
 
 st.set_page_config(page_title="OpsLog", layout="wide")
-create_tables()
-create_manager()
+
+
+@st.cache_resource(show_spinner=False)
+def init_database():
+    # Once per server process rather than on every rerun.
+    create_tables()
+    create_manager()
+    return True
+
+
+init_database()
+
+
+# Reruns within the TTL are served from cache; writes made through this app
+# clear the affected caches, and the TTL bounds staleness from other writers.
+@st.cache_data(ttl=USER_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_user_profile(username):
+    return get_user_profile(username)
+
+
+@st.cache_data(ttl=QUERY_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_search(keyword, page, page_size):
+    return search_incidents(keyword, page=page, page_size=page_size)
+
+
+@st.cache_data(ttl=QUERY_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_incident(incident_id):
+    return get_incident(incident_id)
+
+
+@st.cache_data(ttl=QUERY_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_delete_requests(after, limit):
+    return list_delete_requests(limit=limit, after=after)
+
+
+@st.cache_data(ttl=QUERY_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_users(after, limit):
+    return list_users(limit=limit, after=after)
+
+
+def invalidate_incident_caches():
+    cached_search.clear()
+    cached_incident.clear()
+    cached_delete_requests.clear()
+
+
+def invalidate_user_caches():
+    cached_user_profile.clear()
+    cached_users.clear()
 
 
 def logout():
@@ -54,7 +104,7 @@ def require_active_session():
             return None
     st.session_state.last_active = now.isoformat(timespec="seconds")
 
-    db_user = get_user(st.session_state.user["username"])
+    db_user = cached_user_profile(st.session_state.user["username"])
     if not db_user or not db_user["is_active"]:
         st.error("Your account is not active. Please contact Manager.")
         logout()
@@ -76,7 +126,7 @@ def require_active_session():
     return st.session_state.user
 
 
-def render_readonly_table(df):
+def render_readonly_table(df, hidden_columns=()):
     if df.empty:
         st.info("No data found.")
         return
@@ -118,12 +168,34 @@ def render_readonly_table(df):
         "failed_attempts": "Failed Attempts"
     }
 
-    display_df = df.copy()
-    display_df.columns = [
-        column_aliases.get(col, col.replace("_", " ").title())
-        for col in display_df.columns
-    ]
-    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    # Rename through column_config so the frame itself is never copied.
+    column_config = {
+        col: None if col in hidden_columns else column_aliases.get(col, col.replace("_", " ").title())
+        for col in df.columns
+    }
+    st.dataframe(df, column_config=column_config, use_container_width=True, hide_index=True)
+
+
+def paginated_rows(state_key, fetch, cursor_field, page_size=LIST_PAGE_SIZE):
+    # One page per rerun; the cursors of earlier pages are kept for "Previous".
+    cursors_key = f"{state_key}_cursors"
+    if cursors_key not in st.session_state:
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state[cursors_key]
+
+    rows = fetch(cursors[-1], page_size + 1)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    previous_col, next_col, info_col = st.columns([1, 1, 6])
+    if previous_col.button("Previous", key=f"{state_key}_previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Next", key=f"{state_key}_next", disabled=not has_next):
+        cursors.append(rows[-1][cursor_field])
+        st.rerun()
+    info_col.caption(f"Page {len(cursors)}")
+    return rows
 
 
 user = require_active_session()
@@ -168,6 +240,7 @@ if not user:
             else:
                 try:
                     register(full_name, email, username, password)
+                    cached_users.clear()
                     st.success("Account created. Please wait for Manager role assignment.")
                 except ValueError as exc:
                     st.error(str(exc))
@@ -218,6 +291,7 @@ if menu == "Create Incident":
         }
         try:
             generated_incident_id = create_incident(payload, user["username"], user["full_name"])
+            invalidate_incident_caches()
             st.success(f"Incident created with ID {generated_incident_id} and status 'Open Case'.")
         except ValueError as exc:
             st.error(str(exc))
@@ -234,7 +308,7 @@ elif menu == "Update Incident":
 
     if load_submit:
         lookup_id = normalize_text(incident_id_input)
-        incident = get_incident(lookup_id)
+        incident = cached_incident(lookup_id)
         if not incident:
             st.session_state.update_loaded_incident_id = ""
             st.error("Incident not found.")
@@ -243,7 +317,7 @@ elif menu == "Update Incident":
             st.success(f"Loaded incident: {incident['incident_id']}")
 
     loaded_id = normalize_text(st.session_state.update_loaded_incident_id)
-    incident = get_incident(loaded_id) if loaded_id else None
+    incident = cached_incident(loaded_id) if loaded_id else None
 
     if loaded_id and not incident:
         st.session_state.update_loaded_incident_id = ""
@@ -298,6 +372,7 @@ elif menu == "Update Incident":
                     actor_username=user["username"],
                     actor_full_name=user["full_name"]
                 )
+                invalidate_incident_caches()
                 st.success("Incident updated.")
                 st.rerun()
             except ValueError as exc:
@@ -318,6 +393,7 @@ elif menu == "Delete Incident Request":
         else:
             try:
                 request_delete_incident(incident_id, user["username"], user["role"])
+                cached_delete_requests.clear()
                 st.success("Delete request submitted.")
             except ValueError as exc:
                 st.error(str(exc))
@@ -325,8 +401,8 @@ elif menu == "Delete Incident Request":
 
 elif menu == "Delete Request Approvals":
     st.header("Delete Request Approvals")
-    requests_df = pd.DataFrame(list_delete_requests())
-    render_readonly_table(requests_df)
+    request_rows = paginated_rows("delete_requests", cached_delete_requests, "id")
+    render_readonly_table(pd.DataFrame(request_rows), hidden_columns=("id",))
 
     with st.form("approve_delete_form"):
         incident_id = st.text_input("Incident ID to approve (YYYY-####)")
@@ -340,6 +416,7 @@ elif menu == "Delete Request Approvals":
         else:
             try:
                 approve_delete_request(incident_id, user["username"], user["role"])
+                invalidate_incident_caches()
                 st.success("Incident deleted permanently.")
                 st.rerun()
             except ValueError as exc:
@@ -350,19 +427,30 @@ elif menu == "Search Incident":
     st.header("Search Incident")
     keyword = st.text_input("Keyword (searches all fields)")
     page_size = st.selectbox("Rows per page", [10, 20, 50], index=0)
-    total, _ = search_incidents(keyword, page=1, page_size=page_size)
+
+    # The page lives in session state so the total and the rows come from a
+    # single search call; a new keyword or page size starts at page 1.
+    if st.session_state.get("search_params") != (keyword, page_size):
+        st.session_state.search_params = (keyword, page_size)
+        st.session_state.search_page = 1
+    page = int(st.session_state.get("search_page", 1))
+    total, rows = cached_search(keyword, page, page_size)
     max_pages = max(1, math.ceil(total / page_size))
-    page = st.number_input("Page", min_value=1, max_value=max_pages, value=1, step=1)
-    total, rows = search_incidents(keyword, page=page, page_size=page_size)
+    if page > max_pages:
+        page = max_pages
+        total, rows = cached_search(keyword, page, page_size)
+    st.session_state.search_page = page
+    st.number_input("Page", min_value=1, max_value=max_pages, step=1, key="search_page")
     st.caption(f"Total records: {total} | Page {page}/{max_pages}")
     render_readonly_table(pd.DataFrame(rows))
 
 
 elif menu == "User Control":
     st.header("User Control")
-    users_df = pd.DataFrame(list_users())
-    if not users_df.empty:
-        users_df["is_active"] = users_df["is_active"].apply(lambda x: "Active" if int(x) == 1 else "Suspended")
+    user_rows = paginated_rows("users", cached_users, "username")
+    users_df = pd.DataFrame(
+        [dict(row, is_active="Active" if int(row["is_active"]) == 1 else "Suspended") for row in user_rows]
+    )
     render_readonly_table(users_df)
 
     st.subheader("Assign Role")
@@ -373,6 +461,7 @@ elif menu == "User Control":
     if submit_role:
         try:
             assign_role(user["username"], target_user, new_role)
+            invalidate_user_caches()
             st.success("Role updated.")
             st.rerun()
         except ValueError as exc:
@@ -386,6 +475,7 @@ elif menu == "User Control":
     if submit_status:
         try:
             set_user_active(user["username"], target_user_status, is_active=(action == "Activate"))
+            invalidate_user_caches()
             st.success("Account status updated.")
             st.rerun()
         except ValueError as exc:
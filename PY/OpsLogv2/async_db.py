@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import functools
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import database
+import request_timing
+from metrics import REGISTRY
+
+
+# Readers plus the single writer; more threads would only queue on the pool.
+DB_EXECUTOR_WORKERS = int(os.environ.get("OPSLOG_DB_EXECUTOR_WORKERS", str(database.POOL_SIZE + 1)))
+
+_lock = Lock()
+_executor = None
+_pending = 0
+
+DB_EXECUTOR_QUEUE_DEPTH = REGISTRY.gauge(
+    "opslog_db_executor_pending",
+    "Database calls submitted to the async executor and not yet completed.",
+    callback=lambda: _pending,
+)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, DB_EXECUTOR_WORKERS),
+                thread_name_prefix="opslog-db",
+            )
+        return _executor
+
+
+async def run(fn, *args, **kwargs):
+    global _pending
+    loop = asyncio.get_running_loop()
+    # Copy the caller's context so request-scoped context variables reach the worker.
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    timing = request_timing.current()
+    if timing is not None and timing.profile:
+        call = functools.partial(timing.profiled, call)
+    with _lock:
+        _pending += 1
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_get_executor(), call)
+    finally:
+        with _lock:
+            _pending -= 1
+        if timing is not None:
+            timing.add("db", time.perf_counter() - started)
+
+
+_EXHAUSTED = object()
+
+
+async def iterate(iterable):
+    iterator = iter(iterable)
+    while True:
+        item = await run(next, iterator, _EXHAUSTED)
+        if item is _EXHAUSTED:
+            return
+        yield item
+
+
+def shutdown_executor():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _wrap(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+
+def _wrap_api(module_name, name):
+    # The dashboard queries live in the API package (backend/app). Resolve them
+    # on first call so importing async_db never pulls in, or collides with,
+    # the Streamlit "app" module.
+    async def wrapper(*args, **kwargs):
+        fn = getattr(importlib.import_module(module_name), name)
+        return await run(fn, *args, **kwargs)
+    wrapper.__name__ = wrapper.__qualname__ = name
+    return wrapper
+
+
+create_tables = _wrap(database.create_tables)
+migrate = _wrap(database.migrate)
+schema_version = _wrap(database.schema_version)
+rebuild_search_index = _wrap(database.rebuild_search_index)
+rebuild_dashboard_summary = _wrap(database.rebuild_dashboard_summary)
+pool_stats = _wrap(database.pool_stats)
+
+get_user = _wrap(database.get_user)
+get_user_profile = _wrap(database.get_user_profile)
+create_user = _wrap(database.create_user)
+list_users = _wrap(database.list_users)
+assign_role = _wrap(database.assign_role)
+set_user_active = _wrap(database.set_user_active)
+
+get_login_attempt = _wrap(database.get_login_attempt)
+register_login_failure = _wrap(database.register_login_failure)
+clear_login_attempts = _wrap(database.clear_login_attempts)
+is_login_locked = _wrap(database.is_login_locked)
+
+reserve_incident_ids = _wrap(database.reserve_incident_ids)
+create_incident = _wrap(database.create_incident)
+create_incidents_bulk = _wrap(database.create_incidents_bulk)
+get_incident = _wrap(database.get_incident)
+search_incidents_page = _wrap(database.search_incidents_page)
+search_incidents = _wrap(database.search_incidents)
+update_incident = _wrap(database.update_incident)
+request_delete_incident = _wrap(database.request_delete_incident)
+list_delete_requests = _wrap(database.list_delete_requests)
+approve_delete_request = _wrap(database.approve_delete_request)
+get_change_logs = _wrap(database.get_change_logs)
+get_all_incidents = _wrap(database.get_all_incidents)
+
+get_dashboard_validators = _wrap_api("app.dashboard", "get_dashboard_validators")
+get_dashboard_stats = _wrap_api("app.dashboard", "get_dashboard_stats")
+get_dashboard_trends = _wrap_api("app.dashboard", "get_dashboard_trends")
@@ -1,12 +1,15 @@
+import async_db
 from database import (
     ASSIGNABLE_ROLES,
     clear_login_attempts,
     create_user,
     get_user,
     is_login_locked,
+    log_audit,
     register_login_failure,
     tx
 )
+from hashing import hash_password_async, verify_password_async
 from utils import (
     hash_password,
     normalize_text,
@@ -45,23 +48,17 @@ def create_manager():
                 now_iso()
             )
         )
-        conn.execute(
-            """
-            INSERT INTO audit_logs(actor, action, target_type, target_id, details, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                DEFAULT_MANAGER_USERNAME,
-                "SYSTEM_MANAGER_CREATED",
-                "USER",
-                DEFAULT_MANAGER_USERNAME,
-                "Default manager account created.",
-                now_iso()
-            )
+        log_audit(
+            conn,
+            DEFAULT_MANAGER_USERNAME,
+            "SYSTEM_MANAGER_CREATED",
+            "USER",
+            DEFAULT_MANAGER_USERNAME,
+            "Default manager account created."
         )
 
 
-def register(full_name, email, username, password):
+def _normalize_registration(full_name, email, username, password):
     full_name = normalize_text(full_name)
     email = normalize_text(email).lower()
     username = normalize_text(username)
@@ -77,7 +74,10 @@ def register(full_name, email, username, password):
     ok, msg = validate_password(password)
     if not ok:
         raise ValueError(msg)
+    return full_name, email, username
+
 
+def _ensure_registration_available(username, email):
     if get_user(username):
         raise ValueError("Username already exists.")
     with tx() as conn:
@@ -88,6 +88,10 @@ def register(full_name, email, username, password):
         if email_exists:
             raise ValueError("Email already exists.")
 
+
+def register(full_name, email, username, password):
+    full_name, email, username = _normalize_registration(full_name, email, username, password)
+    _ensure_registration_available(username, email)
     create_user(
         full_name=full_name,
         email=email,
@@ -96,6 +100,26 @@ def register(full_name, email, username, password):
     )
 
 
+async def register_async(full_name, email, username, password):
+    full_name, email, username = _normalize_registration(full_name, email, username, password)
+    await async_db.run(_ensure_registration_available, username, email)
+    password_hash = await hash_password_async(password)
+    await async_db.create_user(
+        full_name=full_name,
+        email=email,
+        username=username,
+        password_hash=password_hash
+    )
+
+
+def _account_block_reason(user):
+    if not user["is_active"]:
+        return "Account suspended. Please contact Manager."
+    if not normalize_text(user["role"]):
+        return "Role not assigned. Please contact Manager."
+    return ""
+
+
 def login(username, password):
     username = normalize_text(username)
     if not username or not password:
@@ -113,11 +137,34 @@ def login(username, password):
         register_login_failure(username)
         return None, "Invalid credentials."
 
-    if not user["is_active"]:
-        return None, "Account suspended. Please contact Manager."
-
-    if not normalize_text(user["role"]):
-        return None, "Role not assigned. Please contact Manager."
+    reason = _account_block_reason(user)
+    if reason:
+        return None, reason
 
     clear_login_attempts(username)
     return user, ""
+
+
+async def login_async(username, password):
+    username = normalize_text(username)
+    if not username or not password:
+        return None, "Username and password are required."
+
+    if await async_db.is_login_locked(username):
+        return None, "Too many failed attempts. Try again in 15 minutes."
+
+    user = await async_db.get_user(username)
+    if not user:
+        await async_db.register_login_failure(username)
+        return None, "Invalid credentials."
+
+    if not await verify_password_async(password, user["password_hash"]):
+        await async_db.register_login_failure(username)
+        return None, "Invalid credentials."
+
+    reason = _account_block_reason(user)
+    if reason:
+        return None, reason
+
+    await async_db.clear_login_attempts(username)
+    return user, ""
@@ -1,65 +1,226 @@
+import hashlib
+from datetime import datetime, timedelta
+from threading import Lock
+
 from database import connect
+from utils import parse_filter_date, to_epoch
+
+
+RECENT_WINDOW_DAYS = 7
+
+_cache_lock = Lock()
+_cache = {"etag": None, "stats": None}
+
+
+def _recent_cutoff():
+    return (datetime.now() - timedelta(days=RECENT_WINDOW_DAYS)).isoformat(timespec="seconds")
 
 
-def get_dashboard_stats():
+def get_dashboard_validators():
+    cutoff = _recent_cutoff()
     with connect() as conn:
-        summary = conn.execute(
+        state = conn.execute(
             """
             SELECT
-                COUNT(*) AS total_incidents,
-                SUM(CASE WHEN status='Open Case' THEN 1 ELSE 0 END) AS open_cases,
-                SUM(CASE WHEN status='Monitoring' THEN 1 ELSE 0 END) AS monitoring_cases,
-                SUM(CASE WHEN status IN ('Resolved', 'Closed') THEN 1 ELSE 0 END) AS resolved_closed_cases,
-                COALESCE(AVG(duration_minutes), 0) AS avg_duration_minutes
-            FROM incidents
-            WHERE is_deleted=0
-            """
+                version,
+                updated_at,
+                (SELECT MIN(modified_at) FROM incidents
+                 WHERE is_deleted=0 AND modified_at >= :cutoff) AS first_in_window,
+                (SELECT MAX(modified_at) FROM incidents
+                 WHERE is_deleted=0 AND modified_at < :cutoff) AS last_out_of_window
+            FROM dashboard_state
+            WHERE id=1
+            """,
+            {"cutoff": cutoff}
         ).fetchone()
 
-        recent = conn.execute(
-            """
-            SELECT COUNT(*) AS incidents_last_7_days
-            FROM incidents
-            WHERE is_deleted=0
-              AND datetime(modified_at) >= datetime('now', '-7 days')
-            """
-        ).fetchone()
+    # The 7-day count also changes when the oldest incident ages out of the
+    # window, so the validators track the window boundary as well as writes.
+    tag_source = f"{state['version']}|{state['first_in_window'] or ''}"
+    etag = f'W/"{hashlib.sha1(tag_source.encode("utf-8")).hexdigest()[:16]}"'
+
+    last_modified = datetime.fromisoformat(state["updated_at"])
+    if state["last_out_of_window"]:
+        try:
+            aged_out_at = datetime.fromisoformat(state["last_out_of_window"]) + timedelta(days=RECENT_WINDOW_DAYS)
+            last_modified = max(last_modified, aged_out_at)
+        except ValueError:
+            pass
+    return etag, last_modified
 
-        top_components_rows = conn.execute(
-            """
-            SELECT component, COUNT(*) AS total
-            FROM incidents
-            WHERE is_deleted=0
-            GROUP BY component
-            ORDER BY total DESC, component ASC
-            LIMIT 5
-            """
-        ).fetchall()
 
-        status_rows = conn.execute(
+def _read_dashboard_stats():
+    with connect() as conn:
+        rows = conn.execute(
             """
-            SELECT status, COUNT(*) AS total
+            SELECT 'status' AS kind, status AS name, total, duration_sum
+            FROM incident_status_stats
+            WHERE total > 0
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'component', component, total, 0
+                FROM incident_component_stats
+                WHERE total > 0
+                ORDER BY total DESC, component ASC
+                LIMIT 5
+            )
+            UNION ALL
+            SELECT 'recent', '', COUNT(*), 0
             FROM incidents
-            WHERE is_deleted=0
-            GROUP BY status
-            ORDER BY total DESC, status ASC
-            """
+            WHERE is_deleted=0 AND modified_at >= ?
+            """,
+            (_recent_cutoff(),)
         ).fetchall()
 
+    status_rows = sorted(
+        (row for row in rows if row["kind"] == "status"),
+        key=lambda row: (-row["total"], row["name"])
+    )
+    top_components_rows = sorted(
+        (row for row in rows if row["kind"] == "component"),
+        key=lambda row: (-row["total"], row["name"])
+    )
+    recent = sum(int(row["total"] or 0) for row in rows if row["kind"] == "recent")
+
+    counts = {row["name"]: int(row["total"]) for row in status_rows}
+    total_incidents = sum(counts.values())
+    duration_sum = sum(int(row["duration_sum"]) for row in status_rows)
     return {
-        "total_incidents": int(summary["total_incidents"] or 0),
-        "open_cases": int(summary["open_cases"] or 0),
-        "monitoring_cases": int(summary["monitoring_cases"] or 0),
-        "resolved_closed_cases": int(summary["resolved_closed_cases"] or 0),
-        "avg_duration_minutes": round(float(summary["avg_duration_minutes"] or 0), 2),
-        "incidents_last_7_days": int(recent["incidents_last_7_days"] or 0),
+        "total_incidents": total_incidents,
+        "open_cases": counts.get("Open Case", 0),
+        "monitoring_cases": counts.get("Monitoring", 0),
+        "resolved_closed_cases": counts.get("Resolved", 0) + counts.get("Closed", 0),
+        "avg_duration_minutes": round(duration_sum / total_incidents, 2) if total_incidents else 0.0,
+        "incidents_last_7_days": recent,
         "top_components": [
-            {"component": row["component"], "total": int(row["total"])}
+            {"component": row["name"], "total": int(row["total"])}
             for row in top_components_rows
         ],
         "status_breakdown": [
-            {"status": row["status"], "total": int(row["total"])}
+            {"status": row["name"], "total": int(row["total"])}
             for row in status_rows
         ],
     }
 
+
+def get_dashboard_stats(etag=None):
+    if etag is None:
+        etag, _ = get_dashboard_validators()
+    with _cache_lock:
+        if _cache["etag"] == etag:
+            return dict(_cache["stats"])
+
+    stats = _read_dashboard_stats()
+    with _cache_lock:
+        _cache["etag"] = etag
+        _cache["stats"] = stats
+    return dict(stats)
+
+
+# bucket -> (SQLite label expression over start_ts, default window, step)
+TREND_BUCKETS = {
+    "hour": ("strftime('%Y-%m-%d %H:00', start_ts, 'unixepoch', 'localtime')", timedelta(days=2), timedelta(hours=1)),
+    "day": ("date(start_ts, 'unixepoch', 'localtime')", timedelta(days=30), timedelta(days=1)),
+    "week": ("date(start_ts, 'unixepoch', 'localtime', 'weekday 0', '-6 days')", timedelta(weeks=12), timedelta(weeks=1)),
+}
+MAX_TREND_BUCKETS = 1000
+
+
+def _bucket_start(value, bucket):
+    if bucket == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def _bucket_label(value, bucket):
+    if bucket == "hour":
+        return value.strftime("%Y-%m-%d %H:00")
+    return value.strftime("%Y-%m-%d")
+
+
+def _trend_range(bucket, date_from=None, date_to=None):
+    window, step = TREND_BUCKETS[bucket][1:]
+    end = parse_filter_date(date_to) + timedelta(days=1) if date_to else datetime.now()
+    start = parse_filter_date(date_from) if date_from else end - window
+    if start >= end:
+        raise ValueError("Start date must be before end date.")
+    start = _bucket_start(start, bucket)
+    if (end - start) / step > MAX_TREND_BUCKETS:
+        raise ValueError(f"Date range is too long for {bucket} buckets.")
+    return start, end
+
+
+def _trend_point(label, total=0, mean=None, p95=None):
+    return {
+        "bucket": label,
+        "total": int(total),
+        "mean_duration_minutes": round(mean, 2) if mean is not None else 0.0,
+        "p95_duration_minutes": int(p95) if p95 is not None else 0,
+    }
+
+
+def get_dashboard_trends(bucket="day", date_from=None, date_to=None):
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"Unsupported trend bucket: {bucket}.")
+    start, end = _trend_range(bucket, date_from, date_to)
+    label_sql = TREND_BUCKETS[bucket][0]
+
+    # One range scan on idx_incidents_live_start_ts; p95 is the nearest-rank
+    # value, ceil(0.95 * n), picked with window functions per bucket and per
+    # (bucket, component).
+    with connect() as conn:
+        rows = conn.execute(
+            f"""
+            WITH base AS (
+                SELECT {label_sql} AS bucket, component, duration_minutes AS duration
+                FROM incidents
+                WHERE is_deleted=0 AND start_ts >= ? AND start_ts < ?
+            ),
+            ranked AS (
+                SELECT bucket, NULL AS component, duration,
+                       ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY duration) AS rn,
+                       COUNT(*) OVER (PARTITION BY bucket) AS total,
+                       AVG(duration) OVER (PARTITION BY bucket) AS mean
+                FROM base
+                UNION ALL
+                SELECT bucket, component, duration,
+                       ROW_NUMBER() OVER (PARTITION BY bucket, component ORDER BY duration),
+                       COUNT(*) OVER (PARTITION BY bucket, component),
+                       AVG(duration) OVER (PARTITION BY bucket, component)
+                FROM base
+            )
+            SELECT bucket, component, total, mean, duration AS p95
+            FROM ranked
+            WHERE rn = (total * 95 + 99) / 100
+            ORDER BY bucket, component IS NOT NULL, total DESC, component
+            """,
+            (to_epoch(start), to_epoch(end))
+        ).fetchall()
+
+    points = {}
+    for row in rows:
+        if row["component"] is None:
+            point = _trend_point(row["bucket"], row["total"], row["mean"], row["p95"])
+            point["components"] = []
+            points[row["bucket"]] = point
+        else:
+            component = _trend_point(row["bucket"], row["total"], row["mean"], row["p95"])
+            del component["bucket"]
+            points[row["bucket"]]["components"].append(dict(component=row["component"], **component))
+
+    step = TREND_BUCKETS[bucket][2]
+    series = []
+    cursor = start
+    while cursor < end:
+        label = _bucket_label(cursor, bucket)
+        series.append(points.pop(label, None) or dict(_trend_point(label), components=[]))
+        cursor += step
+    return {
+        "bucket": bucket,
+        "from": start.isoformat(timespec="seconds"),
+        "to": end.isoformat(timespec="seconds"),
+        "series": series,
+    }
@@ -1,8 +1,15 @@
+import hmac
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
 from typing import Optional
 
-from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 import sys
@@ -10,29 +17,24 @@ import sys
 if str(BASE_DIR) not in sys.path:
     sys.path.append(str(BASE_DIR))
 
-from auth import ROLES, create_manager, login, register
-from database import (
-    INCIDENT_STATUSES,
-    approve_delete_request,
-    assign_role,
-    create_incident,
-    create_tables,
-    get_incident,
-    get_change_logs,
-    list_delete_requests,
-    list_users,
-    request_delete_incident,
-    search_incidents,
-    set_user_active,
-    update_incident,
-)
+import async_db
+import request_timing
+from auth import ROLES, create_manager, login_async, register_async
+from database import INCIDENT_STATUSES, close_pool, iter_incidents_bulk
+
+from exporter import EXPORT_FORMATS, stream_export
+from hashing import HashQueueFullError, shutdown_hashing
+from importer import IMPORT_FORMATS, iter_rows
+from metrics import render_prometheus
+from query_metrics import recent_slow_queries
 
-from .dashboard import get_dashboard_stats
 from .schemas import (
     AuthResponse,
     DashboardResponse,
+    DashboardTrendsResponse,
     DeleteRequestPayload,
     IncidentCreateRequest,
+    IncidentIdReserveRequest,
     IncidentUpdateRequest,
     LoginRequest,
     RegisterRequest,
@@ -41,9 +43,13 @@ from .schemas import (
     UserStatusUpdatePayload,
 )
 from .session import session_store
+from .timing import RequestTimingMiddleware, TimedRoute, get_profile
+
 
+METRICS_TOKEN = os.environ.get("OPSLOG_METRICS_TOKEN", "")
 
 app = FastAPI(title="OpsLog API", version="1.0.0")
+app.router.route_class = TimedRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -51,20 +57,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-OpsLog-Profile-Id"],
 )
+app.add_middleware(RequestTimingMiddleware)
 
 
 @app.on_event("startup")
-def startup_event():
-    create_tables()
-    create_manager()
+async def startup_event():
+    await async_db.create_tables()
+    await async_db.run(create_manager)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    session_store.close()
+    shutdown_hashing()
+    async_db.shutdown_executor()
+    close_pool()
 
 
-def get_current_user(authorization: Optional[str] = Header(default=None)):
+async def get_current_user(authorization: Optional[str] = Header(default=None)):
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header.")
     token = authorization.split(" ", 1)[1].strip()
-    user = session_store.get_user(token)
+    with request_timing.phase("auth"):
+        user = await async_db.run(session_store.get_user, token)
     if not user:
         raise HTTPException(status_code=401, detail="Session expired or invalid token.")
     return user, token
@@ -85,21 +102,61 @@ def get_meta():
     return {"roles": ROLES, "incident_statuses": INCIDENT_STATUSES}
 
 
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Authentication service is busy. Please retry shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.get("/metrics")
+def metrics(authorization: Optional[str] = Header(default=None)):
+    if METRICS_TOKEN:
+        # Scrapers send the token as "Authorization: Bearer <token>".
+        expected = f"Bearer {METRICS_TOKEN}"
+        if not authorization or not hmac.compare_digest(authorization.encode("utf-8"), expected.encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Missing or invalid metrics token.")
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/slow-queries")
+async def metrics_slow_queries(auth=Depends(get_current_user)):
+    user, _ = auth
+    require_role(user, ["Manager"])
+    return recent_slow_queries()
+
+
+@app.get("/metrics/profiles/{profile_id}")
+async def metrics_profile(profile_id: str, auth=Depends(get_current_user)):
+    user, _ = auth
+    require_role(user, ["Manager"])
+    report = get_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(report)
+
+
 @app.post("/auth/register")
-def auth_register(payload: RegisterRequest):
+async def auth_register(payload: RegisterRequest):
     try:
-        register(payload.full_name, payload.email, payload.username, payload.password)
+        await register_async(payload.full_name, payload.email, payload.username, payload.password)
+    except HashQueueFullError:
+        raise _hashing_busy()
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return {"message": "Account created. Please wait for Manager role assignment."}
 
 
 @app.post("/auth/login", response_model=AuthResponse)
-def auth_login(payload: LoginRequest):
-    user, message = login(payload.username, payload.password)
+async def auth_login(payload: LoginRequest):
+    try:
+        user, message = await login_async(payload.username, payload.password)
+    except HashQueueFullError:
+        raise _hashing_busy()
     if not user:
         raise HTTPException(status_code=401, detail=message)
-    token = session_store.create(user["username"])
+    token = await async_db.run(session_store.create, user["username"])
     return {
         "token": token,
         "user": {
@@ -111,31 +168,73 @@ def auth_login(payload: LoginRequest):
 
 
 @app.post("/auth/logout")
-def auth_logout(auth=Depends(get_current_user)):
+async def auth_logout(auth=Depends(get_current_user)):
     _, token = auth
-    session_store.revoke(token)
+    await async_db.run(session_store.revoke, token)
     return {"message": "Logged out"}
 
 
 @app.get("/auth/me")
-def auth_me(auth=Depends(get_current_user)):
+async def auth_me(auth=Depends(get_current_user)):
     user, _ = auth
     return user
 
 
+def _is_not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [value.strip() for value in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # "-0000" dates parse as naive; they are still UTC.
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
 @app.get("/dashboard", response_model=DashboardResponse)
-def dashboard(auth=Depends(get_current_user)):
+async def dashboard(request: Request, response: Response, auth=Depends(get_current_user)):
     _user, _ = auth
-    return get_dashboard_stats()
+    etag, last_modified = await async_db.get_dashboard_validators()
+    last_modified = last_modified.astimezone(timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return await async_db.get_dashboard_stats(etag)
+
+
+@app.get("/dashboard/trends", response_model=DashboardTrendsResponse)
+async def dashboard_trends(
+    bucket: str = Query(default="day", pattern="^(hour|day|week)$"),
+    date_from: Optional[str] = Query(default=None, alias="from"),
+    date_to: Optional[str] = Query(default=None, alias="to"),
+    auth=Depends(get_current_user),
+):
+    _user, _ = auth
+    try:
+        return await async_db.get_dashboard_trends(bucket, date_from, date_to)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.post("/incidents")
-def incidents_create(payload: IncidentCreateRequest, auth=Depends(get_current_user)):
+async def incidents_create(payload: IncidentCreateRequest, auth=Depends(get_current_user)):
     user, _ = auth
     if user["role"] not in ["SO Engineer", "Service Field Engineer", "CS Leader"]:
         raise HTTPException(status_code=403, detail="Role not allowed to create incidents.")
     try:
-        incident_id = create_incident(
+        incident_id = await async_db.create_incident(
             payload.model_dump(),
             actor_username=user["username"],
             actor_full_name=user["full_name"],
@@ -145,97 +244,203 @@ def incidents_create(payload: IncidentCreateRequest, auth=Depends(get_current_us
         raise HTTPException(status_code=400, detail=str(exc))
 
 
+BULK_ERROR_LIMIT = 1000
+
+
+def _run_bulk_import(body_file, fmt: str, user: dict):
+    # Only counts and the first failures are kept, so the response stays small
+    # however many rows were uploaded.
+    summary = {"created": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    with io.TextIOWrapper(body_file, encoding="utf-8-sig", newline="") as text:
+        results = iter_incidents_bulk(
+            iter_rows(text, fmt),
+            actor_username=user["username"],
+            actor_full_name=user["full_name"],
+        )
+        for result in results:
+            if result["ok"]:
+                summary["created"] += 1
+                continue
+            summary["failed"] += 1
+            if len(summary["errors"]) < BULK_ERROR_LIMIT:
+                summary["errors"].append(result)
+            else:
+                summary["errors_truncated"] = True
+    return summary
+
+
+@app.post("/incidents/bulk")
+async def incidents_bulk(
+    request: Request,
+    fmt: Optional[str] = Query(default=None, alias="format", pattern="^(ndjson|csv)$"),
+    auth=Depends(get_current_user),
+):
+    user, _ = auth
+    if user["role"] not in ["SO Engineer", "Service Field Engineer", "CS Leader"]:
+        raise HTTPException(status_code=403, detail="Role not allowed to create incidents.")
+    if not fmt:
+        content_type = request.headers.get("content-type", "").lower()
+        fmt = "csv" if "csv" in content_type else "ndjson"
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported import format.")
+
+    # Spool the upload to disk so large imports never sit in memory.
+    body_file = tempfile.TemporaryFile()
+    try:
+        async for chunk in request.stream():
+            body_file.write(chunk)
+        body_file.seek(0)
+        return await async_db.run(_run_bulk_import, body_file, fmt, user)
+    finally:
+        body_file.close()
+
+
+@app.post("/incidents/ids/reserve")
+async def incidents_reserve_ids(payload: IncidentIdReserveRequest, auth=Depends(get_current_user)):
+    user, _ = auth
+    if user["role"] not in ["SO Engineer", "Service Field Engineer", "CS Leader"]:
+        raise HTTPException(status_code=403, detail="Role not allowed to create incidents.")
+    try:
+        return {"incident_ids": await async_db.reserve_incident_ids(payload.count, user["username"])}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/incidents/export")
+async def incidents_export(
+    fmt: str = Query(default="csv", alias="format", pattern="^(csv|ndjson|xlsx)$"),
+    keyword: str = Query(default=""),
+    date_from: Optional[str] = Query(default=None, alias="from"),
+    date_to: Optional[str] = Query(default=None, alias="to"),
+    auth=Depends(get_current_user),
+):
+    _user, _ = auth
+    try:
+        body = stream_export(fmt, keyword, date_from=date_from, date_to=date_to)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    media_type, extension = EXPORT_FORMATS[fmt]
+    file_name = f"incident_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        async_db.iterate(body),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
 @app.get("/incidents/{incident_id}")
-def incidents_get(incident_id: str, auth=Depends(get_current_user)):
+async def incidents_get(incident_id: str, auth=Depends(get_current_user)):
     _user, _ = auth
-    row = get_incident(incident_id)
+    row = await async_db.get_incident(incident_id)
     if not row:
         raise HTTPException(status_code=404, detail="Incident not found.")
     return row
 
 
 @app.patch("/incidents/{incident_id}")
-def incidents_update(incident_id: str, payload: IncidentUpdateRequest, auth=Depends(get_current_user)):
+async def incidents_update(incident_id: str, payload: IncidentUpdateRequest, auth=Depends(get_current_user)):
     user, _ = auth
     if user["role"] not in ["SO Engineer", "Service Field Engineer", "CS Leader"]:
         raise HTTPException(status_code=403, detail="Role not allowed to update incidents.")
     updates = {k: v for k, v in payload.model_dump().items() if v is not None}
     try:
-        update_incident(incident_id, updates, user["username"], user["full_name"])
+        await async_db.update_incident(incident_id, updates, user["username"], user["full_name"])
         return {"message": "Incident updated."}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/incidents", response_model=SearchResponse)
-def incidents_search(
+async def incidents_search(
     keyword: str = Query(default=""),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=10, ge=1, le=100),
+    after: Optional[str] = Query(default=None),
+    count: str = Query(default="exact", pattern="^(exact|estimate|none)$"),
+    date_from: Optional[str] = Query(default=None, alias="from"),
+    date_to: Optional[str] = Query(default=None, alias="to"),
     auth=Depends(get_current_user),
 ):
     _user, _ = auth
-    total, rows = search_incidents(keyword, page, page_size)
-    return {"total": total, "rows": rows}
+    try:
+        return await async_db.search_incidents_page(
+            keyword,
+            page_size,
+            page=page,
+            after=after,
+            total_mode=count,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/incidents/{incident_id}/changes")
-def incidents_changes(incident_id: str, auth=Depends(get_current_user)):
+async def incidents_changes(incident_id: str, auth=Depends(get_current_user)):
     _user, _ = auth
-    return get_change_logs(incident_id)
+    return await async_db.get_change_logs(incident_id)
 
 
 @app.post("/delete-requests")
-def delete_request_create(payload: DeleteRequestPayload, auth=Depends(get_current_user)):
+async def delete_request_create(payload: DeleteRequestPayload, auth=Depends(get_current_user)):
     user, _ = auth
     try:
-        request_delete_incident(payload.incident_id, user["username"], user["role"])
+        await async_db.request_delete_incident(payload.incident_id, user["username"], user["role"])
         return {"message": "Delete request submitted."}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/delete-requests")
-def delete_requests_list(auth=Depends(get_current_user)):
+async def delete_requests_list(
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    after: Optional[int] = Query(default=None, ge=1),
+    auth=Depends(get_current_user),
+):
     user, _ = auth
     require_role(user, ["Manager", "CS Leader"])
-    return list_delete_requests()
+    return await async_db.list_delete_requests(limit=limit, after=after)
 
 
 @app.post("/delete-requests/approve")
-def delete_request_approve(payload: DeleteRequestPayload, auth=Depends(get_current_user)):
+async def delete_request_approve(payload: DeleteRequestPayload, auth=Depends(get_current_user)):
     user, _ = auth
     try:
-        approve_delete_request(payload.incident_id, user["username"], user["role"])
+        await async_db.approve_delete_request(payload.incident_id, user["username"], user["role"])
         return {"message": "Incident deleted permanently."}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/users")
-def users_list(auth=Depends(get_current_user)):
+async def users_list(
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    after: Optional[str] = Query(default=None),
+    auth=Depends(get_current_user),
+):
     user, _ = auth
     require_role(user, ["Manager"])
-    return list_users()
+    return await async_db.list_users(limit=limit, after=after)
 
 
 @app.post("/users/role")
-def users_assign_role(payload: UserRoleUpdatePayload, auth=Depends(get_current_user)):
+async def users_assign_role(payload: UserRoleUpdatePayload, auth=Depends(get_current_user)):
     user, _ = auth
     require_role(user, ["Manager"])
     try:
-        assign_role(user["username"], payload.username, payload.role)
+        await async_db.assign_role(user["username"], payload.username, payload.role)
         return {"message": "Role updated."}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.post("/users/status")
-def users_update_status(payload: UserStatusUpdatePayload, auth=Depends(get_current_user)):
+async def users_update_status(payload: UserStatusUpdatePayload, auth=Depends(get_current_user)):
     user, _ = auth
     require_role(user, ["Manager"])
     try:
-        set_user_active(user["username"], payload.username, payload.is_active)
+        await async_db.set_user_active(user["username"], payload.username, payload.is_active)
         return {"message": "Account status updated."}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
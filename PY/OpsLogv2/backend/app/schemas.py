@@ -48,6 +48,10 @@ class IncidentUpdateRequest(BaseModel):
     status: Optional[str] = None
 
 
+class IncidentIdReserveRequest(BaseModel):
+    count: int = Field(ge=1, le=10000)
+
+
 class DeleteRequestPayload(BaseModel):
     incident_id: str
 
@@ -63,8 +67,10 @@ class UserStatusUpdatePayload(BaseModel):
 
 
 class SearchResponse(BaseModel):
-    total: int
+    total: Optional[int] = None
+    total_exact: bool = True
     rows: List[dict]
+    next_cursor: Optional[str] = None
 
 
 class DashboardResponse(BaseModel):
@@ -76,3 +82,10 @@ class DashboardResponse(BaseModel):
     incidents_last_7_days: int
     top_components: List[dict]
     status_breakdown: List[dict]
+
+
+class DashboardTrendsResponse(BaseModel):
+    bucket: str
+    date_from: str = Field(alias="from")
+    date_to: str = Field(alias="to")
+    series: List[dict]
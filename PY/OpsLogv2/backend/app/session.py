@@ -1,62 +1,519 @@
+import base64
+import hashlib
+import hmac
+import heapq
+import json
+import os
 import secrets
+import sys
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from threading import Lock
-from typing import Dict, Optional
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Tuple
 
-from database import get_user
+from database import (
+    add_user_change_listener,
+    count_live_sessions,
+    create_session,
+    delete_expired_sessions,
+    delete_session,
+    get_session,
+    delete_expired_revocations,
+    get_user_profile,
+    list_revoked_tokens,
+    list_user_profiles,
+    revoke_token,
+    touch_session,
+)
+from metrics import REGISTRY
 
 
 SESSION_TTL_MINUTES = 30
+USER_CACHE_TTL_SECONDS = 15
+SESSION_SHARDS = 16
+SESSION_BACKEND = os.environ.get("OPSLOG_SESSION_BACKEND", "memory")
+SESSION_REDIS_URL = os.environ.get("OPSLOG_SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Sliding expiry is only written back once this much of the TTL has been used.
+SESSION_TOUCH_SECONDS = int(os.environ.get("OPSLOG_SESSION_TOUCH_SECONDS", "60"))
+SESSION_SWEEP_SECONDS = int(os.environ.get("OPSLOG_SESSION_SWEEP_SECONDS", "60"))
+SESSION_MAX_PER_USER = int(os.environ.get("OPSLOG_SESSION_MAX_PER_USER", "10"))
+SESSION_SECRET = os.environ.get("OPSLOG_SESSION_SECRET", "")
+# How often signed-token mode reloads role versions and the revocation list.
+SESSION_REFRESH_SECONDS = int(os.environ.get("OPSLOG_SESSION_REFRESH_SECONDS", "5"))
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
 @dataclass
 class SessionData:
     username: str
-    created_at: datetime
-    expires_at: datetime
+    created_at: float
+    expires_at: float
 
 
-class SessionStore:
-    def __init__(self) -> None:
+class _Sweeper:
+    def __init__(self, name: str, interval: int, sweep) -> None:
+        self._name = name
+        self._interval = interval
+        self._sweep = sweep
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
         self._lock = Lock()
-        self._sessions: Dict[str, SessionData] = {}
 
-    def create(self, username: str) -> str:
-        token = secrets.token_urlsafe(32)
-        now = datetime.now()
+    def start(self) -> None:
+        if self._thread is not None or self._interval <= 0:
+            return
         with self._lock:
-            self._sessions[token] = SessionData(
-                username=username,
-                created_at=now,
-                expires_at=now + timedelta(minutes=SESSION_TTL_MINUTES),
-            )
-        return token
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
 
-    def get_user(self, token: str) -> Optional[dict]:
-        now = datetime.now()
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                self._sweep(time.time())
+            except Exception:
+                # A locked or closed database is retried on the next tick.
+                pass
+
+    def stop(self) -> None:
         with self._lock:
-            data = self._sessions.get(token)
+            thread, self._thread = self._thread, None
+            self._stopped.set()
+        if thread is not None:
+            thread.join(timeout=5)
+
+
+def _entry_size(token: str, data: SessionData) -> int:
+    # Token and record plus one heap tuple and one per-user LRU slot.
+    return (
+        sys.getsizeof(token)
+        + sys.getsizeof(data)
+        + sys.getsizeof(data.__dict__)
+        + sys.getsizeof((data.expires_at, token))
+        + 100
+    )
+
+
+class MemorySessionBackend:
+    def __init__(
+        self,
+        sweep_seconds: int = SESSION_SWEEP_SECONDS,
+        max_per_user: int = SESSION_MAX_PER_USER,
+    ) -> None:
+        self._locks: List[Lock] = [Lock() for _ in range(SESSION_SHARDS)]
+        self._shards: List[Dict[str, SessionData]] = [{} for _ in range(SESSION_SHARDS)]
+        # Per-shard min-heaps of (expires_at, token). Entries go stale when a
+        # session slides or is removed and are re-checked when they surface.
+        self._heaps: List[List[Tuple[float, str]]] = [[] for _ in range(SESSION_SHARDS)]
+        self._sizes: List[int] = [0] * SESSION_SHARDS
+        self._max_per_user = max_per_user
+        self._user_sessions: Dict[str, "OrderedDict[str, None]"] = {}
+        self._user_lock = Lock()
+        self._sweeper = _Sweeper("opslog-session-sweeper", sweep_seconds, self.sweep)
+
+    def _index(self, token: str) -> int:
+        return hash(token) % SESSION_SHARDS
+
+    def _remove_locked(self, index: int, token: str) -> Optional[SessionData]:
+        data = self._shards[index].pop(token, None)
+        if data is not None:
+            self._sizes[index] -= _entry_size(token, data)
+        return data
+
+    def _forget(self, username: str, tokens: List[str]) -> None:
+        with self._user_lock:
+            recent = self._user_sessions.get(username)
+            if recent is None:
+                return
+            for token in tokens:
+                recent.pop(token, None)
+            if not recent:
+                del self._user_sessions[username]
+
+    def put(self, token: str, username: str, created_at: float, expires_at: float) -> None:
+        self._sweeper.start()
+        index = self._index(token)
+        data = SessionData(username, created_at, expires_at)
+        with self._locks[index]:
+            self._shards[index][token] = data
+            self._sizes[index] += _entry_size(token, data)
+            heapq.heappush(self._heaps[index], (expires_at, token))
+
+        evicted = []
+        with self._user_lock:
+            recent = self._user_sessions.setdefault(username, OrderedDict())
+            recent[token] = None
+            while self._max_per_user > 0 and len(recent) > self._max_per_user:
+                evicted.append(recent.popitem(last=False)[0])
+        for old_token in evicted:
+            old_index = self._index(old_token)
+            with self._locks[old_index]:
+                self._remove_locked(old_index, old_token)
+
+    def get(self, token: str, now: float, ttl: float) -> Optional[str]:
+        index = self._index(token)
+        with self._locks[index]:
+            data = self._shards[index].get(token)
             if not data:
                 return None
             if data.expires_at <= now:
-                self._sessions.pop(token, None)
-                return None
-            data.expires_at = now + timedelta(minutes=SESSION_TTL_MINUTES)
-            user = get_user(data.username)
-            if not user or not user.get("is_active"):
-                self._sessions.pop(token, None)
-                return None
-            return {
-                "username": user["username"],
-                "full_name": user["full_name"],
-                "role": user["role"],
-            }
+                self._remove_locked(index, token)
+                expired = True
+            else:
+                expired = False
+                # The heap keeps the older deadline; sweep() re-queues it.
+                data.expires_at = now + ttl
+            username = data.username
+
+        if expired:
+            self._forget(username, [token])
+            return None
+        with self._user_lock:
+            recent = self._user_sessions.get(username)
+            if recent is not None and token in recent:
+                recent.move_to_end(token)
+        return username
+
+    def delete(self, token: str) -> None:
+        index = self._index(token)
+        with self._locks[index]:
+            data = self._remove_locked(index, token)
+        if data is not None:
+            self._forget(data.username, [token])
+
+    def sweep(self, now: float) -> int:
+        removed = 0
+        for index in range(SESSION_SHARDS):
+            expired: Dict[str, List[str]] = {}
+            with self._locks[index]:
+                heap = self._heaps[index]
+                sessions = self._shards[index]
+                while heap and heap[0][0] <= now:
+                    _, token = heapq.heappop(heap)
+                    data = sessions.get(token)
+                    if data is None:
+                        continue
+                    if data.expires_at > now:
+                        heapq.heappush(heap, (data.expires_at, token))
+                        continue
+                    self._remove_locked(index, token)
+                    expired.setdefault(data.username, []).append(token)
+                # Drop stale entries once they outnumber live sessions.
+                if len(heap) > 2 * len(sessions) + 64:
+                    self._heaps[index] = [(data.expires_at, token) for token, data in sessions.items()]
+                    heapq.heapify(self._heaps[index])
+            for username, tokens in expired.items():
+                self._forget(username, tokens)
+                removed += len(tokens)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        count = 0
+        size = 0
+        for index in range(SESSION_SHARDS):
+            with self._locks[index]:
+                count += len(self._shards[index])
+                size += self._sizes[index] + sys.getsizeof(self._shards[index])
+        return {"sessions": count, "memory_bytes": size}
+
+    def close(self) -> None:
+        self._sweeper.stop()
+
+
+class SQLiteSessionBackend:
+    def __init__(self, sweep_seconds: int = SESSION_SWEEP_SECONDS) -> None:
+        self._sweeper = _Sweeper("opslog-session-sweeper", sweep_seconds, delete_expired_sessions)
+
+    def put(self, token: str, username: str, created_at: float, expires_at: float) -> None:
+        self._sweeper.start()
+        create_session(_hash_token(token), username, created_at, expires_at)
+
+    def get(self, token: str, now: float, ttl: float) -> Optional[str]:
+        self._sweeper.start()
+        token_hash = _hash_token(token)
+        row = get_session(token_hash)
+        if not row:
+            return None
+        if row["expires_at"] <= now:
+            delete_session(token_hash)
+            return None
+        if row["expires_at"] - now < ttl - SESSION_TOUCH_SECONDS:
+            touch_session(token_hash, now + ttl)
+        return row["username"]
+
+    def delete(self, token: str) -> None:
+        delete_session(_hash_token(token))
+
+    def stats(self) -> Dict[str, int]:
+        return {"sessions": count_live_sessions(time.time()), "memory_bytes": 0}
+
+    def close(self) -> None:
+        self._sweeper.stop()
+
+
+class RedisSessionBackend:
+    def __init__(self, url: str = SESSION_REDIS_URL, prefix: str = "opslog:session:") -> None:
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis session backend requires the 'redis' package.")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _key(self, token: str) -> str:
+        return self._prefix + _hash_token(token)
+
+    def put(self, token: str, username: str, created_at: float, expires_at: float) -> None:
+        self._client.set(self._key(token), username, ex=max(1, int(expires_at - created_at)))
+
+    def get(self, token: str, now: float, ttl: float) -> Optional[str]:
+        # Redis expires keys itself, so there is nothing to sweep.
+        key = self._key(token)
+        pipe = self._client.pipeline()
+        pipe.get(key)
+        pipe.ttl(key)
+        username, remaining = pipe.execute()
+        if username is None:
+            return None
+        if remaining < ttl - SESSION_TOUCH_SECONDS:
+            self._client.expire(key, int(ttl))
+        return username.decode("utf-8")
+
+    def delete(self, token: str) -> None:
+        self._client.delete(self._key(token))
+
+    def stats(self) -> Dict[str, int]:
+        count = sum(1 for _ in self._client.scan_iter(match=self._prefix + "*", count=1000))
+        return {"sessions": count, "memory_bytes": 0}
+
+    def close(self) -> None:
+        self._client.close()
+
+
+SESSION_BACKENDS = {
+    "memory": MemorySessionBackend,
+    "sqlite": SQLiteSessionBackend,
+    "redis": RedisSessionBackend,
+}
+
+
+def create_backend(name: str = SESSION_BACKEND):
+    if name not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend: {name}.")
+    return SESSION_BACKENDS[name]()
+
+
+class SessionStore:
+    def __init__(self, backend=None) -> None:
+        self._backend = backend if backend is not None else create_backend()
+        self._ttl = SESSION_TTL_MINUTES * 60
+        # username -> (expires_at monotonic, profile or None); read without a lock.
+        self._user_cache: Dict[str, Tuple[float, Optional[dict]]] = {}
+        self._user_generations: Dict[str, int] = {}
+        self._user_cache_lock = Lock()
+        add_user_change_listener(self.invalidate_user)
+
+    def create(self, username: str) -> str:
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        self._backend.put(token, username, now, now + self._ttl)
+        return token
+
+    def _load_user(self, username: str) -> Optional[dict]:
+        now = time.monotonic()
+        cached = self._user_cache.get(username)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        generation = self._user_generations.get(username, 0)
+        user = get_user_profile(username)
+        with self._user_cache_lock:
+            # Skip the store if the user was invalidated while we were reading.
+            if self._user_generations.get(username, 0) == generation:
+                self._user_cache[username] = (now + USER_CACHE_TTL_SECONDS, user)
+        return user
+
+    def invalidate_user(self, username: str) -> None:
+        with self._user_cache_lock:
+            self._user_generations[username] = self._user_generations.get(username, 0) + 1
+            self._user_cache.pop(username, None)
+
+    def get_user(self, token: str) -> Optional[dict]:
+        username = self._backend.get(token, time.time(), self._ttl)
+        if not username:
+            return None
+
+        user = self._load_user(username)
+        if not user or not user.get("is_active"):
+            self._backend.delete(token)
+            return None
+        return {
+            "username": user["username"],
+            "full_name": user["full_name"],
+            "role": user["role"],
+        }
+
+    def revoke(self, token: str) -> None:
+        self._backend.delete(token)
+
+    def stats(self) -> Dict[str, int]:
+        return self._backend.stats()
+
+    def close(self) -> None:
+        self._backend.close()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SignedSessionStore:
+    # Tokens are rejected once the user's role_version moves on (role change or
+    # suspension) or their jti is revoked. Both are cached in-process and
+    # refreshed in the background, so validation does not wait on SQLite.
+    def __init__(self, secret: str = SESSION_SECRET, refresh_seconds: int = SESSION_REFRESH_SECONDS) -> None:
+        if not secret:
+            # A per-process random key would log users out on every restart
+            # and reject tokens issued by the other workers.
+            raise RuntimeError("Signed sessions require OPSLOG_SESSION_SECRET to be set.")
+        self._secret = secret.encode("utf-8")
+        self._ttl = SESSION_TTL_MINUTES * 60
+        self._users: Dict[str, dict] = {}
+        self._version = -1
+        self._revoked: frozenset = frozenset()
+        self._lock = Lock()
+        self._loaded = False
+        self._refresher = _Sweeper("opslog-token-refresh", refresh_seconds, self.refresh)
+        self._sweeper = _Sweeper("opslog-token-sweeper", SESSION_SWEEP_SECONDS, delete_expired_revocations)
+        add_user_change_listener(self.invalidate_user)
+
+    def _sign(self, body: str) -> str:
+        return _b64encode(hmac.new(self._secret, body.encode("ascii"), hashlib.sha256).digest())
+
+    def _decode(self, token: str) -> Optional[dict]:
+        body, _, signature = token.partition(".")
+        if not body or not signature or not hmac.compare_digest(signature, self._sign(body)):
+            return None
+        try:
+            return json.loads(_b64decode(body))
+        except ValueError:
+            return None
+
+    def refresh(self, now: Optional[float] = None) -> None:
+        # Only users whose role_version passed the last one seen are reloaded;
+        # the first refresh loads everyone.
+        changed = list_user_profiles(None if self._version < 0 else self._version)
+        revoked = frozenset(list_revoked_tokens(time.time() if now is None else now))
+        with self._lock:
+            if changed:
+                users = dict(self._users)
+                for row in changed:
+                    users[row["username"]] = row
+                self._users = users
+                self._version = max(self._version, max(row["role_version"] for row in changed))
+            elif self._version < 0:
+                self._version = 0
+            self._revoked = revoked
+            self._loaded = True
+
+    def _ensure_started(self) -> None:
+        if not self._loaded:
+            self.refresh()
+        self._refresher.start()
+        self._sweeper.start()
+
+    def invalidate_user(self, username: str) -> None:
+        self._store_user(username, get_user_profile(username))
+
+    def _store_user(self, username: str, user: Optional[dict]) -> None:
+        with self._lock:
+            users = dict(self._users)
+            if user:
+                users[username] = user
+            else:
+                users.pop(username, None)
+            self._users = users
+
+    def _current_user(self, username: str, role_version: int) -> Optional[dict]:
+        user = self._users.get(username)
+        if user is None or user["role_version"] < role_version:
+            # Created or changed by another worker since the last refresh.
+            self.invalidate_user(username)
+            user = self._users.get(username)
+        return user
+
+    def create(self, username: str) -> str:
+        self._ensure_started()
+        user = get_user_profile(username)
+        if not user:
+            raise ValueError("User does not exist.")
+        self._store_user(username, user)
+        payload = {
+            "sub": user["username"],
+            "name": user["full_name"],
+            "role": user["role"],
+            "rv": user["role_version"],
+            "exp": int(time.time()) + self._ttl,
+            "jti": secrets.token_urlsafe(12),
+        }
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        return f"{body}.{self._sign(body)}"
+
+    def get_user(self, token: str) -> Optional[dict]:
+        self._ensure_started()
+        payload = self._decode(token)
+        if not payload or payload.get("exp", 0) <= time.time() or payload.get("jti") in self._revoked:
+            return None
+        user = self._current_user(payload["sub"], payload["rv"])
+        if not user or not user["is_active"] or user["role_version"] != payload["rv"]:
+            return None
+        return {
+            "username": payload["sub"],
+            "full_name": payload["name"],
+            "role": payload["role"],
+        }
 
     def revoke(self, token: str) -> None:
+        payload = self._decode(token)
+        if not payload:
+            return
+        revoke_token(payload["jti"], payload["exp"])
         with self._lock:
-            self._sessions.pop(token, None)
+            self._revoked = self._revoked | {payload["jti"]}
+
+    def stats(self) -> Dict[str, int]:
+        # Tokens live with the clients; only the revocation list is held here.
+        return {"sessions": 0, "memory_bytes": sys.getsizeof(self._revoked)}
+
+    def close(self) -> None:
+        self._refresher.stop()
+        self._sweeper.stop()
+
+
+def create_session_store(name: str = SESSION_BACKEND):
+    if name == "signed":
+        return SignedSessionStore()
+    return SessionStore(create_backend(name))
 
 
-session_store = SessionStore()
+session_store = create_session_store()
 
+SESSIONS_LIVE = REGISTRY.gauge(
+    "opslog_sessions_live",
+    "Sessions currently held by the session backend.",
+    callback=lambda: session_store.stats()["sessions"],
+)
+SESSIONS_MEMORY = REGISTRY.gauge(
+    "opslog_sessions_memory_bytes",
+    "Approximate memory held by in-process sessions (0 for external backends).",
+    callback=lambda: session_store.stats()["memory_bytes"],
+)
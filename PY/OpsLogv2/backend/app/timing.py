@@ -0,0 +1,243 @@
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from fastapi.routing import APIRoute
+
+import async_db
+import request_timing
+from metrics import REGISTRY
+
+from .session import session_store
+
+
+SERVER_TIMING_ENABLED = os.environ.get("OPSLOG_SERVER_TIMING", "1") != "0"
+PROFILE_HEADER = "x-opslog-profile"
+PROFILE_ROLES = ("Manager",)
+PROFILE_HISTORY = 20
+PROFILE_TOP_FUNCTIONS = 40
+
+# Phases emitted in Server-Timing. db and hash overlap with auth and app:
+# they are the time spent waiting on the DB executor and the hashing pool.
+PHASES = (
+    ("auth", "Session lookup"),
+    ("db", "Database calls"),
+    ("hash", "Password hashing"),
+    ("app", "Endpoint"),
+    ("serialize", "Request parsing and response serialization"),
+)
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "opslog_http_request_seconds",
+    "HTTP request latency until the response body was sent.",
+    ("method", "route", "status"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+REQUEST_PHASE_SECONDS = REGISTRY.histogram(
+    "opslog_http_request_phase_seconds",
+    "Per-request time spent in auth, db, hash, app and serialize.",
+    ("method", "route", "phase"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+_profiles = OrderedDict()
+_profiles_lock = Lock()
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def _store_profile(profile_id, report):
+    with _profiles_lock:
+        _profiles[profile_id] = report
+        while len(_profiles) > PROFILE_HISTORY:
+            _profiles.popitem(last=False)
+
+
+def _route_label(scope):
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(timing, total):
+    entries = []
+    for name, description in PHASES:
+        seconds = timing.get(name)
+        if seconds:
+            entries.append(f'{name};dur={seconds * 1000:.2f};desc="{description}"')
+    entries.append(f'total;dur={total * 1000:.2f};desc="Total"')
+    return ", ".join(entries)
+
+
+def _bearer_token(scope):
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            value = value.decode("latin-1")
+            if value.lower().startswith("bearer "):
+                return value.split(" ", 1)[1].strip()
+    return None
+
+
+def _header(scope, wanted):
+    for name, value in scope.get("headers", ()):
+        if name == wanted:
+            return value.decode("latin-1").strip().lower()
+    return None
+
+
+class _Profiler:
+    def __init__(self, mode, timing):
+        self.mode = mode
+        self.timing = timing
+        self._profiler = None
+
+    def start(self):
+        if self.mode == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._profiler = Profiler(async_mode="enabled")
+            self._profiler.start()
+            return
+        self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError:
+            self._profiler = None
+
+    def report(self):
+        if self._profiler is None:
+            return "Profiler unavailable: another profiler is active."
+        if self.mode == "pyinstrument":
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True)
+        self._profiler.disable()
+        out = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=out)
+        # Merge the per-call profiles collected in async_db worker threads.
+        for profile in self.timing.profiles:
+            stats.add(profile)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return out.getvalue()
+
+
+def _profile_mode(requested):
+    if requested in ("1", "true", "cprofile"):
+        return "cprofile"
+    if requested == "pyinstrument":
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            return None
+        return "pyinstrument"
+    return None
+
+
+async def _may_profile(scope):
+    token = _bearer_token(scope)
+    if not token:
+        return False
+    user = await async_db.run(session_store.get_user, token)
+    return bool(user) and user.get("role") in PROFILE_ROLES
+
+
+class RequestTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile_mode = None
+        requested = _header(scope, PROFILE_HEADER.encode("latin-1"))
+        if requested:
+            profile_mode = _profile_mode(requested)
+            if profile_mode and not await _may_profile(scope):
+                profile_mode = None
+
+        timing, token = request_timing.start(profile=profile_mode == "cprofile")
+        profiler = None
+        profile_id = None
+        if profile_mode:
+            profiler = _Profiler(profile_mode, timing)
+            profile_id = uuid.uuid4().hex[:16]
+            profiler.start()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                if SERVER_TIMING_ENABLED:
+                    headers.append((b"server-timing", _server_timing(timing, timing.elapsed()).encode("latin-1")))
+                if profile_id:
+                    headers.append((b"x-opslog-profile-id", profile_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            total = timing.elapsed()
+            request_timing.finish(token)
+            if profiler is not None:
+                _store_profile(profile_id, profiler.report())
+            method = scope["method"]
+            route = _route_label(scope)
+            REQUEST_SECONDS.observe(total, method=method, route=route, status=str(status))
+            for name, _ in PHASES:
+                seconds = timing.get(name)
+                if seconds:
+                    REQUEST_PHASE_SECONDS.observe(seconds, method=method, route=route, phase=name)
+
+
+def _timed_endpoint(call):
+    if getattr(call, "_opslog_timed", False):
+        return call
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            with request_timing.phase("app"):
+                return await call(*args, **kwargs)
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            with request_timing.phase("app"):
+                return call(*args, **kwargs)
+    endpoint._opslog_timed = True
+    return endpoint
+
+
+class TimedRoute(APIRoute):
+    # Splits the route handler into the endpoint call ("app") and everything
+    # FastAPI does around it; dependencies time themselves (get_current_user
+    # records "auth"), so the remainder is parsing and serialization.
+    def get_route_handler(self):
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timing = request_timing.current()
+            if timing is None:
+                return await handler(request)
+            started = time.perf_counter()
+            before = timing.get("auth") + timing.get("app")
+            try:
+                return await handler(request)
+            finally:
+                spent = time.perf_counter() - started
+                inner = timing.get("auth") + timing.get("app") - before
+                timing.add("serialize", max(0.0, spent - inner))
+
+        return timed_handler
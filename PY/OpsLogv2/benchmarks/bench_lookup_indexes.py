@@ -0,0 +1,161 @@
+"""Lookup latency for change-log, audit and delete-request access paths as history grows.
+
+Run from PY/OpsLogv2:
+
+    python benchmarks/bench_lookup_indexes.py --sizes 10000,100000,1000000,10000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+import database
+
+
+ROWS_PER_INCIDENT = 20
+BATCH = 50000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _populate(conn, audit_rows):
+    # History per incident stays constant, so any growth in lookup time
+    # comes from the table size rather than from returning more rows.
+    incident_count = max(1, audit_rows // ROWS_PER_INCIDENT)
+    incident_ids = [f"INC-2025-{i:07d}" for i in range(1, incident_count + 1)]
+    now = "2025-01-01T00:00:00"
+    rng = random.Random(42)
+
+    written = 0
+    while written < audit_rows:
+        n = min(BATCH, audit_rows - written)
+        conn.execute("BEGIN")
+        conn.executemany(
+            """
+            INSERT INTO audit_logs(actor, action, target_type, target_id, details, created_at)
+            VALUES ('bench', 'INCIDENT_UPDATE', 'INCIDENT', ?, 'Updated incident fields.', ?)
+            """,
+            ((rng.choice(incident_ids), now) for _ in range(n))
+        )
+        conn.executemany(
+            """
+            INSERT INTO incident_change_logs(incident_id, field_name, old_value, new_value, modified_by, modified_at)
+            VALUES (?, 'remark', 'a', 'b', 'bench', ?)
+            """,
+            ((rng.choice(incident_ids), now) for _ in range(n))
+        )
+        conn.execute("COMMIT")
+        written += n
+
+    conn.execute("BEGIN")
+    conn.executemany(
+        """
+        INSERT INTO delete_requests(incident_id, requested_by, status, requested_at)
+        VALUES (?, 'bench', 'Rejected', ?)
+        """,
+        ((incident_id, now) for incident_id in incident_ids)
+    )
+    conn.execute("COMMIT")
+    return incident_ids
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+def run(size, repeats):
+    workdir = tempfile.mkdtemp(prefix="opslog_bench_")
+    database.DB_NAME = os.path.join(workdir, "bench.db")
+    database.create_tables()
+
+    with database.get_pool().writer() as conn:
+        start = time.perf_counter()
+        incident_ids = _populate(conn, size)
+        load_seconds = time.perf_counter() - start
+        conn.execute("ANALYZE")
+
+    rng = random.Random(7)
+    targets = [rng.choice(incident_ids) for _ in range(repeats)]
+    it = iter(targets * 4)
+
+    def change_logs():
+        database.get_change_logs(next(it))
+
+    def audit_delete():
+        try:
+            with database.tx(immediate=True) as conn:
+                conn.execute(
+                    "DELETE FROM audit_logs WHERE target_type='INCIDENT' AND target_id=?",
+                    (next(it),)
+                )
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def delete_request_lookup():
+        with database.connect() as conn:
+            conn.execute(
+                "SELECT id, status FROM delete_requests WHERE incident_id=? ORDER BY id DESC LIMIT 1",
+                (next(it),)
+            ).fetchone()
+            conn.execute(
+                "SELECT 1 FROM delete_requests WHERE incident_id=? AND status='Pending'",
+                (next(it),)
+            ).fetchone()
+
+    result = {
+        "audit_rows": size,
+        "load_seconds": round(load_seconds, 2),
+        "get_change_logs_ms": _time(change_logs, repeats),
+        "audit_delete_by_target_ms": _time(audit_delete, repeats),
+        "delete_request_lookup_ms": _time(delete_request_lookup, repeats),
+    }
+    database.close_pool()
+    for suffix in ("", "-wal", "-shm"):
+        path = database.DB_NAME + suffix
+        if os.path.exists(path):
+            os.remove(path)
+    os.rmdir(workdir)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated audit history sizes.")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        result = run(size, args.repeats)
+        results.append(result)
+        print(
+            f"{result['audit_rows']:>10} rows | change logs {result['get_change_logs_ms']:.3f} ms"
+            f" | audit delete {result['audit_delete_by_target_ms']:.3f} ms"
+            f" | delete request {result['delete_request_lookup_ms']:.3f} ms"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"benchmark": "lookup_indexes", "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
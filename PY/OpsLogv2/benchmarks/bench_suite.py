@@ -0,0 +1,270 @@
+"""Data-layer and API benchmarks over synthetic datasets.
+
+Run from PY/OpsLogv2:
+
+    python benchmarks/bench_suite.py --sizes 10000,100000,1000000,10000000 --output results.json
+    python benchmarks/compare.py baseline.json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+# The backend package must win over the Streamlit app.py for "import app".
+sys.path.insert(0, str(BASE_DIR / "backend"))
+
+import database
+import exporter
+from datagen import PENDING_DELETE_REQUESTS, cached_dataset
+
+
+PAGE_SIZE = 20
+WRITE_CONCURRENCY = 16
+KEYWORD = "disk"
+ACTOR = ("bench", "Bench User")
+
+
+def _summary(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))], 4)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return _summary(samples)
+
+
+def _payload(rng, now):
+    start = now - timedelta(minutes=rng.randint(60, 60 * 24 * 30))
+    end = start + timedelta(minutes=rng.randint(1, 480))
+    return {
+        "error_name": "Bench failure",
+        "component": rng.choice(["Storage", "Network", "Gateway"]),
+        "root_cause": "synthetic load",
+        "remark": f"bench run {rng.random()}",
+        "action_taken": "none",
+        "start_date": start.strftime("%d/%m/%Y"),
+        "start_time": start.strftime("%I:%M %p"),
+        "end_date": end.strftime("%d/%m/%Y"),
+        "end_time": end.strftime("%I:%M %p"),
+    }
+
+
+def _deep_page(keyword):
+    total, _ = database.search_incidents(keyword, page=1, page_size=PAGE_SIZE)
+    return max(1, total // PAGE_SIZE // 2)
+
+
+def run_micro(size, repeats, export_max_rows):
+    from app.dashboard import _read_dashboard_stats, get_dashboard_stats
+
+    rng = random.Random(7)
+    now = datetime.now()
+    results = {}
+
+    deep_all = _deep_page("")
+    deep_keyword = _deep_page(KEYWORD)
+    results["search_all_page1"] = _time(lambda: database.search_incidents("", 1, PAGE_SIZE), repeats)
+    results["search_all_deep_page"] = _time(lambda: database.search_incidents("", deep_all, PAGE_SIZE), repeats)
+    results["search_keyword_page1"] = _time(lambda: database.search_incidents(KEYWORD, 1, PAGE_SIZE), repeats)
+    results["search_keyword_deep_page"] = _time(
+        lambda: database.search_incidents(KEYWORD, deep_keyword, PAGE_SIZE), repeats
+    )
+
+    created = []
+    results["create_incident"] = _time(
+        lambda: created.append(database.create_incident(_payload(rng, now), *ACTOR)), repeats
+    )
+    with ThreadPoolExecutor(WRITE_CONCURRENCY) as pool:
+        # One sample is WRITE_CONCURRENCY creates issued at once, which is where group commit pays off.
+        results["create_incident_concurrent"] = _time(
+            lambda: list(pool.map(
+                lambda _: database.create_incident(_payload(rng, now), *ACTOR), range(WRITE_CONCURRENCY)
+            )),
+            repeats
+        )
+    targets = iter(created * 2)
+    results["update_incident"] = _time(
+        lambda: database.update_incident(next(targets), {"remark": f"updated {rng.random()}"}, *ACTOR), repeats
+    )
+
+    pending = iter(row["incident_id"] for row in database.list_delete_requests() if row["status"] == "Pending")
+    results["approve_delete_request"] = _time(
+        lambda: database.approve_delete_request(next(pending), "manager", "Manager"),
+        min(repeats, PENDING_DELETE_REQUESTS),
+    )
+
+    results["dashboard_stats_cached"] = _time(get_dashboard_stats, repeats)
+    results["dashboard_stats_uncached"] = _time(_read_dashboard_stats, repeats)
+
+    if size <= export_max_rows:
+        workdir = tempfile.mkdtemp(prefix="opslog_export_")
+        target = os.path.join(workdir, "report.xlsx")
+        results["export_to_excel"] = _time(lambda: exporter.export_to_excel(target), 1)
+        results["export_csv_stream"] = _time(
+            lambda: sum(len(chunk) for chunk in exporter.stream_export("csv")), 1
+        )
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+async def _drive(client, method, url, headers, requests, concurrency):
+    samples = []
+    statuses = {}
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers)
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = _summary(samples)
+    result["rps"] = round(len(samples) / elapsed, 1)
+    result["status_codes"] = {str(code): count for code, count in sorted(statuses.items())}
+    return result
+
+
+def run_api(requests, concurrency):
+    import httpx
+    import async_db
+    from auth import create_manager
+    from app.main import app
+    from app.session import session_store
+
+    create_manager()
+    token = session_store.create("manager")
+    headers = {"Authorization": f"Bearer {token}"}
+    with database.connect() as conn:
+        incident_id = conn.execute("SELECT incident_id FROM incidents ORDER BY id DESC LIMIT 1").fetchone()[0]
+
+    endpoints = {
+        "GET /health": "/health",
+        "GET /incidents": f"/incidents?page_size={PAGE_SIZE}",
+        "GET /incidents?keyword": f"/incidents?keyword={KEYWORD}&page_size={PAGE_SIZE}",
+        "GET /incidents?count=none": f"/incidents?keyword={KEYWORD}&page_size={PAGE_SIZE}&count=none",
+        "GET /incidents/{id}": f"/incidents/{incident_id}",
+        "GET /dashboard": "/dashboard",
+        "GET /dashboard/trends": "/dashboard/trends?bucket=day",
+    }
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            for name, url in endpoints.items():
+                await _drive(client, "GET", url, headers, min(20, requests), concurrency)
+                results[name] = await _drive(client, "GET", url, headers, requests, concurrency)
+            return results
+
+    try:
+        return asyncio.run(main())
+    finally:
+        session_store.revoke(token)
+        async_db.shutdown_executor()
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(size, args):
+    source = cached_dataset(size, args.cache_dir, progress=print if args.verbose else None)
+    workdir = tempfile.mkdtemp(prefix="opslog_bench_")
+    database.DB_NAME = os.path.join(workdir, "bench.db")
+    # Benchmarks write, so each run works on a copy of the cached dataset.
+    shutil.copyfile(source, database.DB_NAME)
+    try:
+        result = {"dataset_rows": size, "micro": run_micro(size, args.repeats, args.export_max_rows)}
+        if not args.skip_api:
+            result["api"] = run_api(args.api_requests, args.concurrency)
+        return result
+    finally:
+        database.close_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated incident counts.")
+    parser.add_argument("--repeats", type=int, default=50, help="Samples per micro-benchmark.")
+    parser.add_argument("--api-requests", type=int, default=500, help="Requests per API endpoint.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-process API clients.")
+    parser.add_argument("--skip-api", action="store_true", help="Only run the data-layer benchmarks.")
+    parser.add_argument("--export-max-rows", type=int, default=200000, help="Skip exports above this size.")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(tempfile.gettempdir(), "opslog_bench_data"),
+        help="Where generated datasets are kept between runs.",
+    )
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = {"benchmark": "suite", "meta": _metadata(), "results": []}
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        result = run(size, args)
+        report["results"].append(result)
+        print(f"== {size} incidents")
+        for name, stats in result["micro"].items():
+            print(f"  {name:<28} p50 {stats['p50_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms")
+        for name, stats in result.get("api", {}).items():
+            print(
+                f"  {name:<28} p50 {stats['p50_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms"
+                f"  p99 {stats['p99_ms']:>10.3f} ms  {stats['rps']:>8.1f} req/s"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare two bench_suite.py JSON results and flag regressions.
+
+Run from PY/OpsLogv2:
+
+    python benchmarks/compare.py baseline.json candidate.json --metric p95_ms --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as fh:
+        report = json.load(fh)
+    rows = {}
+    for result in report.get("results", []):
+        for group in ("micro", "api"):
+            for name, stats in result.get(group, {}).items():
+                rows[(result["dataset_rows"], group, name)] = stats
+    return report.get("meta", {}), rows
+
+
+def compare(baseline, candidate, metric="p50_ms", threshold=10.0):
+    _, before = _load(baseline)
+    _, after = _load(candidate)
+    lines = []
+    regressions = []
+    for key in sorted(set(before) & set(after)):
+        old = before[key].get(metric)
+        new = after[key].get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        size, group, name = key
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "improved"
+        lines.append(f"{size:>10} {group:<5} {name:<28} {old:>12.3f} {new:>12.3f} {change:>+8.1f}% {flag}")
+    missing = sorted(set(before) ^ set(after))
+    return lines, regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50_ms", help="p50_ms, p95_ms, p99_ms or mean_ms.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown treated as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression.")
+    args = parser.parse_args(argv)
+
+    before_meta, _ = _load(args.baseline)
+    after_meta, _ = _load(args.candidate)
+    print(f"baseline  {before_meta.get('commit')}  {before_meta.get('created_at')}")
+    print(f"candidate {after_meta.get('commit')}  {after_meta.get('created_at')}")
+    print(f"{'rows':>10} {'group':<5} {'benchmark':<28} {'baseline':>12} {'candidate':>12} {'change':>9}")
+
+    lines, regressions, missing = compare(args.baseline, args.candidate, args.metric, args.threshold)
+    for line in lines:
+        print(line)
+    for size, group, name in missing:
+        print(f"{size:>10} {group:<5} {name:<28} only in one file")
+    print(f"{len(regressions)} regression(s) above {args.threshold:.0f}% on {args.metric}.")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
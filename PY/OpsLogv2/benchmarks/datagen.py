@@ -0,0 +1,175 @@
+"""Synthetic OpsLog databases for benchmarking.
+
+Run from PY/OpsLogv2:
+
+    python benchmarks/datagen.py --incidents 1000000 --output /tmp/opslog_1m.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+import database
+
+
+BATCH = 50000
+CHANGE_LOGS_PER_INCIDENT = 2
+AUDIT_ROWS_PER_INCIDENT = 2
+PENDING_DELETE_REQUESTS = 1000
+SPAN_DAYS = 730
+
+ERRORS = [
+    "Disk full", "Network timeout", "Service crash", "Memory leak", "Certificate expired",
+    "Database deadlock", "Queue backlog", "DNS failure", "Login outage", "Backup failure",
+]
+COMPONENTS = [
+    "Storage", "Network", "Gateway", "Billing", "Auth", "Search", "Scheduler",
+    "Reporting", "Mail", "Payments", "Inventory", "Monitoring",
+]
+CAUSES = [
+    "log rotation disabled", "expired credentials", "misconfigured firewall rule",
+    "unbounded cache growth", "hardware fault", "bad deployment", "upstream provider outage",
+]
+ACTIONS = [
+    "cleaned up and added alert", "rolled back release", "rotated certificate",
+    "restarted service", "failed over to replica", "increased capacity",
+]
+USERS = ["alice", "bob", "carol", "dave", "erin"]
+
+
+def _incident_rows(rng, start_id, count, now):
+    for number in range(start_id, start_id + count):
+        start = now - timedelta(minutes=rng.randint(60, SPAN_DAYS * 24 * 60))
+        duration = rng.randint(1, 8 * 60)
+        end = start + timedelta(minutes=duration)
+        error = rng.choice(ERRORS)
+        component = rng.choice(COMPONENTS)
+        yield (
+            f"INC-{start.year}-{number:08d}",
+            error,
+            component,
+            rng.choice(CAUSES),
+            f"{error} on {component.lower()} node {rng.randint(1, 40)}",
+            rng.choice(ACTIONS),
+            start.strftime("%d/%m/%Y"),
+            start.strftime("%I:%M %p"),
+            end.strftime("%d/%m/%Y"),
+            end.strftime("%I:%M %p"),
+            duration,
+            rng.choice(database.INCIDENT_STATUSES),
+            f"{rng.choice(USERS).title()} ({rng.choice(USERS)})",
+            (start + timedelta(minutes=duration + rng.randint(0, 600))).isoformat(timespec="seconds"),
+            int(start.timestamp()),
+            int(end.timestamp()),
+        )
+
+
+def generate(db_path, incidents, seed=42, progress=None):
+    database.DB_NAME = db_path
+    # Load into the base tables only; the remaining migrations then build the
+    # search index, dashboard summary and lookup indexes in one pass each
+    # instead of through per-row triggers.
+    version, _, base_tables = database.MIGRATIONS[0]
+    with database.tx(immediate=True) as conn:
+        base_tables(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+    rng = random.Random(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    created_at = now.isoformat(timespec="seconds")
+
+    with database.get_pool().writer() as conn:
+        written = 0
+        while written < incidents:
+            count = min(BATCH, incidents - written)
+            rows = list(_incident_rows(rng, written + 1, count, now))
+            ids = [row[0] for row in rows]
+            conn.execute("BEGIN")
+            conn.executemany(
+                """
+                INSERT INTO incidents(
+                    incident_id, error_name, component, root_cause, remark, action_taken,
+                    start_date, start_time, end_date, end_time, duration_minutes, status,
+                    modified_by, modified_at, is_deleted, start_ts, end_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+                """,
+                rows
+            )
+            conn.executemany(
+                "INSERT INTO incident_registry(incident_id, created_at) VALUES (?, ?)",
+                ((incident_id, created_at) for incident_id in ids)
+            )
+            conn.executemany(
+                """
+                INSERT INTO incident_change_logs(incident_id, field_name, old_value, new_value, modified_by, modified_at)
+                VALUES (?, 'remark', 'before', 'after', 'bench', ?)
+                """,
+                ((incident_id, created_at) for incident_id in ids for _ in range(CHANGE_LOGS_PER_INCIDENT))
+            )
+            conn.executemany(
+                """
+                INSERT INTO audit_logs(actor, action, target_type, target_id, details, created_at)
+                VALUES ('bench', 'INCIDENT_UPDATE', 'INCIDENT', ?, 'Updated incident fields.', ?)
+                """,
+                ((incident_id, created_at) for incident_id in ids for _ in range(AUDIT_ROWS_PER_INCIDENT))
+            )
+            conn.execute("COMMIT")
+            written += count
+            if progress:
+                progress(f"{written}/{incidents} incidents")
+
+        conn.execute("BEGIN")
+        pending = rng.sample(range(1, incidents + 1), min(PENDING_DELETE_REQUESTS, incidents))
+        conn.executemany(
+            """
+            INSERT INTO delete_requests(incident_id, requested_by, status, requested_at)
+            SELECT incident_id, 'bench', 'Pending', ? FROM incidents WHERE id=?
+            """,
+            ((created_at, row_id) for row_id in pending)
+        )
+        conn.execute("COMMIT")
+
+    database.migrate(progress=progress)
+    with database.get_pool().writer() as conn:
+        conn.execute("ANALYZE")
+    database.close_pool()
+    return db_path
+
+
+def cached_dataset(incidents, cache_dir, seed=42, progress=None):
+    # Large datasets take minutes to build, so they are kept between runs and
+    # keyed by size, seed and schema version.
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"opslog_{incidents}_s{seed}_v{database.SCHEMA_VERSION}.db")
+    if not os.path.exists(path):
+        partial = path + ".partial"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(partial + suffix):
+                os.remove(partial + suffix)
+        generate(partial, incidents, seed=seed, progress=progress)
+        os.replace(partial, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--incidents", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True, help="SQLite file to create.")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.output):
+        parser.error(f"{args.output} already exists.")
+    start = time.perf_counter()
+    generate(args.output, args.incidents, seed=args.seed, progress=print)
+    print(f"Generated {args.incidents} incidents in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
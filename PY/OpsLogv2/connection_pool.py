@@ -0,0 +1,202 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from threading import Condition, Lock, local
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Reader/writer aware SQLite pool.
+
+    Readers share a bounded set of connections; a thread keeps the same reader
+    for the whole of its outermost ``reader()`` block so nested lookups reuse it.
+    All writes go through one connection guarded by a lock, which matches
+    SQLite's single-writer model and keeps lock waits inside Python.
+    """
+
+    def __init__(self, database, size=8, wait_timeout=10.0, busy_timeout=30.0, factory=sqlite3.Connection, on_wait=None):
+        self.database = database
+        self.factory = factory
+        # Called as on_wait(kind, seconds) after waiting for a reader or the writer.
+        self.on_wait = on_wait
+        self.size = max(1, int(size))
+        self.wait_timeout = float(wait_timeout)
+        self.busy_timeout = float(busy_timeout)
+        self._cond = Condition()
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._local = local()
+        self._writer = None
+        self._writer_lock = Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "writer_acquires": 0,
+            "writer_waits": 0,
+            "writer_timeouts": 0,
+        }
+
+    def _new_connection(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=self.factory
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def _waited(self, kind, started):
+        if self.on_wait is not None:
+            self.on_wait(kind, time.monotonic() - started)
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.wait_timeout
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed.")
+                if self._idle:
+                    self._stats["hits"] += 1
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    self._stats["misses"] += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError("Timed out waiting for a database connection.")
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                self._cond.wait(remaining)
+        if waited:
+            self._waited("reader", started)
+        if conn is not None:
+            return conn
+
+        try:
+            return self._new_connection()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                conn.close()
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def reader(self):
+        if getattr(self._local, "writer", None) is not None:
+            yield self._local.writer
+            return
+
+        held = getattr(self._local, "reader", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self.acquire()
+        self._local.reader = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.reader = None
+            self._local.depth = 0
+            self.release(conn)
+
+    def held_writer(self):
+        return getattr(self._local, "writer", None)
+
+    @contextmanager
+    def writer(self):
+        if self.held_writer() is not None:
+            raise RuntimeError("Nested write transactions are not supported.")
+
+        if not self._writer_lock.acquire(blocking=False):
+            with self._cond:
+                self._stats["writer_waits"] += 1
+            started = time.monotonic()
+            if not self._writer_lock.acquire(timeout=self.busy_timeout):
+                with self._cond:
+                    self._stats["writer_timeouts"] += 1
+                raise PoolTimeoutError("Timed out waiting for the database writer.")
+            self._waited("writer", started)
+        try:
+            with self._cond:
+                self._stats["writer_acquires"] += 1
+            if self._writer is None:
+                self._writer = self._new_connection()
+            self._local.writer = self._writer
+            try:
+                yield self._writer
+            finally:
+                self._local.writer = None
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+        finally:
+            self._writer_lock.release()
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data["size"] = self.size
+            data["open"] = self._open
+            data["idle"] = len(self._idle)
+            data["in_use"] = self._open - len(self._idle)
+        data["writer_open"] = self._writer is not None
+        return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
@@ -1,13 +1,24 @@
 import sqlite3
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
+from threading import Lock, local
+import base64
+import json
+import logging
+import os
 import re
+import time
 
+from connection_pool import ConnectionPool
+from query_metrics import InstrumentedConnection, observe_lock_wait
+from write_queue import WriteQueue, run_in_savepoint
 from utils import (
     calculate_duration_minutes,
     contains_script_like_text,
     normalize_text,
-    now_iso
+    now_iso,
+    parse_filter_date,
+    to_epoch
 )
 
 
@@ -15,133 +26,373 @@ DB_NAME = "opslog.db"
 ROLE_OPTIONS = ["SO Engineer", "Service Field Engineer", "CS Leader", "Manager"]
 ASSIGNABLE_ROLES = ["SO Engineer", "Service Field Engineer", "CS Leader"]
 INCIDENT_STATUSES = ["Open Case", "Monitoring", "Resolved", "Closed"]
+SEARCH_TOTAL_MODES = ["exact", "estimate", "none"]
+SEARCH_ESTIMATE_CAP = 1000
+
+POOL_SIZE = int(os.environ.get("OPSLOG_DB_POOL_SIZE", "8"))
+POOL_WAIT_SECONDS = float(os.environ.get("OPSLOG_DB_POOL_WAIT_SECONDS", "10"))
+BUSY_TIMEOUT_SECONDS = float(os.environ.get("OPSLOG_DB_BUSY_TIMEOUT_SECONDS", "30"))
+INSTRUMENT_QUERIES = os.environ.get("OPSLOG_DB_INSTRUMENT", "1") != "0"
+GROUP_COMMIT = os.environ.get("OPSLOG_DB_GROUP_COMMIT", "1") != "0"
+WRITE_BATCH_MAX = int(os.environ.get("OPSLOG_DB_WRITE_BATCH_MAX", "64"))
+WRITE_BATCH_WAIT_MS = float(os.environ.get("OPSLOG_DB_WRITE_BATCH_WAIT_MS", "0"))
+AUDIT_ARCHIVE_DIR = os.environ.get("OPSLOG_AUDIT_ARCHIVE_DIR", "")
+AUDIT_ARCHIVE_CHUNK_SIZE = 5000
+
+audit_logger = logging.getLogger("opslog.audit")
+
+_pool = None
+_pool_lock = Lock()
+_write_queue = None
+_audit_buffer = local()
+
+
+def get_pool():
+    global _pool
+    pool = _pool
+    if pool is not None and pool.database == DB_NAME:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.database != DB_NAME:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(
+                DB_NAME,
+                size=POOL_SIZE,
+                wait_timeout=POOL_WAIT_SECONDS,
+                busy_timeout=BUSY_TIMEOUT_SECONDS,
+                factory=InstrumentedConnection if INSTRUMENT_QUERIES else sqlite3.Connection,
+                on_wait=observe_lock_wait
+            )
+        return _pool
+
+
+def configure_pool(size=None, wait_timeout=None, busy_timeout=None):
+    global POOL_SIZE, POOL_WAIT_SECONDS, BUSY_TIMEOUT_SECONDS, _pool
+    if size is not None:
+        POOL_SIZE = max(1, int(size))
+    if wait_timeout is not None:
+        POOL_WAIT_SECONDS = float(wait_timeout)
+    if busy_timeout is not None:
+        BUSY_TIMEOUT_SECONDS = float(busy_timeout)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_write_queue():
+    global _write_queue
+    pool = get_pool()
+    with _pool_lock:
+        if _write_queue is None or _write_queue.pool is not pool:
+            if _write_queue is not None:
+                _write_queue.close()
+            _write_queue = WriteQueue(
+                pool,
+                max_batch=WRITE_BATCH_MAX,
+                max_wait=WRITE_BATCH_WAIT_MS / 1000,
+                before_commit=_flush_audit,
+                on_abort=_discard_audit
+            )
+        return _write_queue
+
+
+def close_pool():
+    global _pool, _write_queue
+    with _pool_lock:
+        if _write_queue is not None:
+            _write_queue.close()
+            _write_queue = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats():
+    return get_pool().stats()
 
 
+@contextmanager
 def connect():
-    conn = sqlite3.connect(DB_NAME, timeout=30, isolation_level=None)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("PRAGMA journal_mode = WAL")
-    return conn
+    with get_pool().reader() as conn:
+        yield conn
+
+
+def _audited(op):
+    def run(conn):
+        # Audit rows buffered by a failed operation must not reach the commit.
+        rows = _pending_audit()
+        snapshot = list(rows)
+        try:
+            return op(conn)
+        except BaseException:
+            rows[:] = snapshot
+            raise
+    return run
+
+
+def write(op):
+    # Runs op(conn) in the group-commit writer and returns its result once the
+    # shared transaction has committed.
+    held = get_pool().held_writer()
+    if held is not None:
+        # Already inside tx() or a queued operation on this thread.
+        return run_in_savepoint(held, _audited(op))
+    if not GROUP_COMMIT:
+        with tx(immediate=True) as conn:
+            return op(conn)
+    return get_write_queue().submit(_audited(op)).result()
 
 
 @contextmanager
 def tx(immediate=False):
-    conn = connect()
-    try:
+    with get_pool().writer() as conn:
         conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+        try:
+            yield conn
+            _flush_audit(conn)
+            conn.commit()
+        except Exception:
+            _discard_audit()
+            conn.rollback()
+            raise
 
 
-def create_tables():
-    with tx() as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL DEFAULT '',
-                is_active INTEGER NOT NULL DEFAULT 1,
-                created_at TEXT NOT NULL
-            )
-            """
+def _migration_base_tables(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT '',
+            is_active INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS incidents(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                incident_id TEXT NOT NULL UNIQUE COLLATE BINARY,
-                error_name TEXT NOT NULL,
-                component TEXT NOT NULL,
-                root_cause TEXT NOT NULL,
-                remark TEXT NOT NULL,
-                action_taken TEXT NOT NULL,
-                start_date TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_date TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                duration_minutes INTEGER NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Open Case',
-                modified_by TEXT NOT NULL,
-                modified_at TEXT NOT NULL,
-                is_deleted INTEGER NOT NULL DEFAULT 0
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS incidents(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id TEXT NOT NULL UNIQUE COLLATE BINARY,
+            error_name TEXT NOT NULL,
+            component TEXT NOT NULL,
+            root_cause TEXT NOT NULL,
+            remark TEXT NOT NULL,
+            action_taken TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            duration_minutes INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Open Case',
+            modified_by TEXT NOT NULL,
+            modified_at TEXT NOT NULL,
+            is_deleted INTEGER NOT NULL DEFAULT 0,
+            start_ts INTEGER,
+            end_ts INTEGER
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS incident_registry(
-                incident_id TEXT PRIMARY KEY COLLATE BINARY,
-                created_at TEXT NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS incident_registry(
+            incident_id TEXT PRIMARY KEY COLLATE BINARY,
+            created_at TEXT NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS incident_change_logs(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                incident_id TEXT NOT NULL,
-                field_name TEXT NOT NULL,
-                old_value TEXT,
-                new_value TEXT,
-                modified_by TEXT NOT NULL,
-                modified_at TEXT NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS incident_change_logs(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id TEXT NOT NULL,
+            field_name TEXT NOT NULL,
+            old_value TEXT,
+            new_value TEXT,
+            modified_by TEXT NOT NULL,
+            modified_at TEXT NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS delete_requests(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                incident_id TEXT NOT NULL,
-                requested_by TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Pending',
-                approver TEXT,
-                requested_at TEXT NOT NULL,
-                approved_at TEXT
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS delete_requests(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id TEXT NOT NULL,
+            requested_by TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Pending',
+            approver TEXT,
+            requested_at TEXT NOT NULL,
+            approved_at TEXT
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS audit_logs(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                actor TEXT NOT NULL,
-                action TEXT NOT NULL,
-                target_type TEXT NOT NULL,
-                target_id TEXT,
-                details TEXT,
-                created_at TEXT NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_logs(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            actor TEXT NOT NULL,
+            action TEXT NOT NULL,
+            target_type TEXT NOT NULL,
+            target_id TEXT,
+            details TEXT,
+            created_at TEXT NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS login_attempts(
-                username TEXT PRIMARY KEY,
-                failed_attempts INTEGER NOT NULL DEFAULT 0,
-                locked_until TEXT,
-                last_attempt TEXT
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS login_attempts(
+            username TEXT PRIMARY KEY,
+            failed_attempts INTEGER NOT NULL DEFAULT 0,
+            locked_until TEXT,
+            last_attempt TEXT
         )
-        _migrate_legacy_schema(conn)
-        conn.execute(
-            """
-            CREATE UNIQUE INDEX IF NOT EXISTS uq_pending_delete_request
-            ON delete_requests(incident_id)
-            WHERE status='Pending'
-            """
+        """
+    )
+    _migrate_legacy_schema(conn)
+    conn.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_pending_delete_request
+        ON delete_requests(incident_id)
+        WHERE status='Pending'
+        """
+    )
+
+
+def _migration_id_sequences(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS incident_id_sequences(
+            year TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL
         )
+        """
+    )
+
+
+def _migration_lookup_indexes(conn):
+    # rowid (= id) is the implicit trailing key of every index, so these also
+    # serve the "ORDER BY id DESC" that the lookups use.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_change_logs_incident
+        ON incident_change_logs(incident_id)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_target
+        ON audit_logs(target_type, target_id)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_delete_requests_incident
+        ON delete_requests(incident_id)
+        """
+    )
+
+
+def _migration_sessions(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sessions(
+            token_hash TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires_at
+        ON sessions(expires_at)
+        """
+    )
+
+
+def _migration_signed_tokens(conn):
+    if not _has_column(conn, "users", "role_version"):
+        conn.execute("ALTER TABLE users ADD COLUMN role_version INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens(
+            jti TEXT PRIMARY KEY,
+            expires_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at
+        ON revoked_tokens(expires_at)
+        """
+    )
+
+
+def _migration_audit_archive(conn):
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_created_at
+        ON audit_logs(created_at)
+        """
+    )
+
+
+def _migration_audit_archive_targets(conn):
+    # Which archive files hold rows for each target, so purging one target
+    # only opens the archives that can contain it.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_archive_targets(
+            target_type TEXT NOT NULL,
+            target_id TEXT NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY(target_type, target_id, path)
+        ) WITHOUT ROWID
+        """
+    )
+    for _, path in list_audit_archives():
+        archive = _connect_audit_archive(path, "ro")
+        try:
+            targets = archive.execute(
+                "SELECT DISTINCT target_type, target_id FROM audit_logs WHERE target_id <> ''"
+            ).fetchall()
+        finally:
+            archive.close()
+        _index_archived_targets(conn, targets, path)
+
+
+def _migration_audit_archive_purges(conn):
+    # Targets whose archived history still has to be removed, written in the
+    # same transaction as the delete approval.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_archive_purges(
+            target_type TEXT NOT NULL,
+            target_id TEXT NOT NULL,
+            PRIMARY KEY(target_type, target_id)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _migration_user_versions(conn):
+    # role_version is bumped to MAX(role_version) + 1, so it also works as a
+    # watermark for users changed since the last refresh.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_role_version
+        ON users(role_version)
+        """
+    )
 
 
 def _has_column(conn, table_name, column_name):
@@ -157,7 +408,282 @@ def _table_exists(conn, table_name):
     return row is not None
 
 
+INCIDENT_SEARCH_COLUMNS = [
+    "incident_id", "error_name", "component", "root_cause", "remark", "action_taken",
+    "start_date", "start_time", "end_date", "end_time", "status", "modified_by"
+]
+
+
+def _create_search_index(conn):
+    if _table_exists(conn, "incidents_fts"):
+        return
+
+    columns = ", ".join(INCIDENT_SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{c}" for c in INCIDENT_SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{c}" for c in INCIDENT_SEARCH_COLUMNS)
+    conn.execute(
+        f"""
+        CREATE VIRTUAL TABLE incidents_fts USING fts5(
+            {columns},
+            content='incidents',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS incidents_fts_ai AFTER INSERT ON incidents BEGIN
+            INSERT INTO incidents_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS incidents_fts_ad AFTER DELETE ON incidents BEGIN
+            INSERT INTO incidents_fts(incidents_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS incidents_fts_au AFTER UPDATE OF {columns} ON incidents BEGIN
+            INSERT INTO incidents_fts(incidents_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO incidents_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+        """
+    )
+    conn.execute("INSERT INTO incidents_fts(incidents_fts) VALUES ('rebuild')")
+
+
+def rebuild_search_index():
+    with tx(immediate=True) as conn:
+        if not _table_exists(conn, "incidents_fts"):
+            _create_search_index(conn)
+        else:
+            conn.execute("INSERT INTO incidents_fts(incidents_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO incidents_fts(incidents_fts) VALUES ('optimize')")
+        return conn.execute("SELECT COUNT(*) AS n FROM incidents").fetchone()["n"]
+
+
+def _create_dashboard_summary(conn):
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_incidents_live_modified_at
+        ON incidents(modified_at)
+        WHERE is_deleted=0
+        """
+    )
+    if _table_exists(conn, "dashboard_state"):
+        return
+
+    conn.execute(
+        """
+        CREATE TABLE incident_status_stats(
+            status TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            duration_sum INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE incident_component_stats(
+            component TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX idx_component_stats_total
+        ON incident_component_stats(total DESC, component)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE dashboard_state(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO dashboard_state(id, version, updated_at) VALUES (1, 0, ?)",
+        (now_iso(),)
+    )
+
+    add_new = """
+        INSERT INTO incident_status_stats(status, total, duration_sum)
+        SELECT new.status, 1, new.duration_minutes WHERE new.is_deleted=0
+        ON CONFLICT(status) DO UPDATE SET
+            total=total + 1,
+            duration_sum=duration_sum + excluded.duration_sum;
+        INSERT INTO incident_component_stats(component, total)
+        SELECT new.component, 1 WHERE new.is_deleted=0
+        ON CONFLICT(component) DO UPDATE SET total=total + 1;
+    """
+    remove_old = """
+        UPDATE incident_status_stats
+        SET total=total - 1, duration_sum=duration_sum - old.duration_minutes
+        WHERE status=old.status AND old.is_deleted=0;
+        DELETE FROM incident_status_stats WHERE status=old.status AND total <= 0;
+        UPDATE incident_component_stats
+        SET total=total - 1
+        WHERE component=old.component AND old.is_deleted=0;
+        DELETE FROM incident_component_stats WHERE component=old.component AND total <= 0;
+    """
+    bump_version = """
+        UPDATE dashboard_state
+        SET version=version + 1,
+            updated_at=strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')
+        WHERE id=1;
+    """
+    conn.execute(
+        f"""
+        CREATE TRIGGER incidents_stats_ai AFTER INSERT ON incidents BEGIN
+            {add_new}
+            {bump_version}
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER incidents_stats_ad AFTER DELETE ON incidents BEGIN
+            {remove_old}
+            {bump_version}
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER incidents_stats_au
+        AFTER UPDATE OF status, component, duration_minutes, is_deleted, modified_at ON incidents BEGIN
+            {remove_old}
+            {add_new}
+            {bump_version}
+        END
+        """
+    )
+    _recompute_dashboard_summary(conn)
+
+
+def _recompute_dashboard_summary(conn):
+    # One grouped scan feeds both summary tables.
+    status_totals = {}
+    component_totals = {}
+    for row in conn.execute(
+        """
+        SELECT status, component, COUNT(*) AS total, COALESCE(SUM(duration_minutes), 0) AS duration_sum
+        FROM incidents
+        WHERE is_deleted=0
+        GROUP BY status, component
+        """
+    ):
+        total, duration_sum = status_totals.get(row["status"], (0, 0))
+        status_totals[row["status"]] = (total + row["total"], duration_sum + row["duration_sum"])
+        component_totals[row["component"]] = component_totals.get(row["component"], 0) + row["total"]
+
+    conn.execute("DELETE FROM incident_status_stats")
+    conn.execute("DELETE FROM incident_component_stats")
+    conn.executemany(
+        "INSERT INTO incident_status_stats(status, total, duration_sum) VALUES (?, ?, ?)",
+        [(status, total, duration_sum) for status, (total, duration_sum) in status_totals.items()]
+    )
+    conn.executemany(
+        "INSERT INTO incident_component_stats(component, total) VALUES (?, ?)",
+        list(component_totals.items())
+    )
+    conn.execute(
+        "UPDATE dashboard_state SET version=version + 1, updated_at=? WHERE id=1",
+        (now_iso(),)
+    )
+
+
+def rebuild_dashboard_summary():
+    with tx(immediate=True) as conn:
+        if not _table_exists(conn, "dashboard_state"):
+            _create_dashboard_summary(conn)
+        else:
+            _recompute_dashboard_summary(conn)
+        return conn.execute("SELECT version FROM dashboard_state WHERE id=1").fetchone()["version"]
+
+
+def _sql_normalize(column):
+    return f"trim(COALESCE({column}, ''), ' ' || char(9, 10, 11, 12, 13))"
+
+
+_VALID_ROLES_SQL = ", ".join(f"'{role}'" for role in ROLE_OPTIONS)
+_VALID_STATUSES_SQL = ", ".join(f"'{status}'" for status in INCIDENT_STATUSES)
+
+# Each legacy table is copied with set-based INSERT ... SELECT statements over
+# a rowid window (:lo, :hi], so a chunk is one transaction and can be resumed.
+LEGACY_COPIES = [
+    (
+        "users_legacy",
+        [
+            f"""
+            INSERT INTO users(full_name, email, username, password_hash, role, is_active, created_at)
+            SELECT full_name, email, username, password,
+                   CASE WHEN role IN ({_VALID_ROLES_SQL}) THEN role ELSE '' END,
+                   CASE WHEN is_active THEN 1 ELSE 0 END,
+                   :now
+            FROM users_legacy
+            WHERE rowid > :lo AND rowid <= :hi
+            """
+        ]
+    ),
+    (
+        "incidents_legacy",
+        [
+            f"""
+            INSERT INTO incidents(
+                incident_id, error_name, component, root_cause, remark, action_taken,
+                start_date, start_time, end_date, end_time, duration_minutes, status,
+                modified_by, modified_at, is_deleted
+            )
+            SELECT 'LEGACY-' || id,
+                   {_sql_normalize("error")},
+                   {_sql_normalize("component")},
+                   {_sql_normalize("root_cause")},
+                   '',
+                   {_sql_normalize("action_taken")},
+                   '', '', '', '',
+                   CAST(COALESCE(downtime, 0) AS INTEGER),
+                   CASE WHEN status IN ({_VALID_STATUSES_SQL}) THEN status ELSE 'Open Case' END,
+                   COALESCE(NULLIF({_sql_normalize("created_by")}, ''), 'legacy'),
+                   COALESCE(NULLIF({_sql_normalize("modified")}, ''), :now),
+                   0
+            FROM incidents_legacy
+            WHERE rowid > :lo AND rowid <= :hi
+            """,
+            """
+            INSERT OR IGNORE INTO incident_registry(incident_id, created_at)
+            SELECT 'LEGACY-' || id, :now
+            FROM incidents_legacy
+            WHERE rowid > :lo AND rowid <= :hi
+            """
+        ]
+    ),
+    (
+        "delete_requests_legacy",
+        [
+            """
+            INSERT INTO delete_requests(incident_id, requested_by, status, requested_at)
+            SELECT CAST(incident_id AS TEXT), requested_by, 'Pending', :now
+            FROM delete_requests_legacy
+            WHERE rowid > :lo AND rowid <= :hi
+            """
+        ]
+    ),
+]
+LEGACY_COPY_CHUNK_SIZE = 50000
+
+
 def _migrate_legacy_schema(conn):
+    # Only the renames and new tables happen here; the data is moved by
+    # copy_legacy_tables() in resumable chunks once this transaction commits.
     if _table_exists(conn, "users") and _has_column(conn, "users", "password"):
         conn.execute("ALTER TABLE users RENAME TO users_legacy")
         conn.execute(
@@ -174,30 +700,6 @@ def _migrate_legacy_schema(conn):
             )
             """
         )
-        rows = conn.execute(
-            """
-            SELECT full_name, email, username, password, role, is_active
-            FROM users_legacy
-            """
-        ).fetchall()
-        for row in rows:
-            role = row["role"] if row["role"] in ROLE_OPTIONS else ""
-            conn.execute(
-                """
-                INSERT INTO users(full_name, email, username, password_hash, role, is_active, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    row["full_name"],
-                    row["email"],
-                    row["username"],
-                    row["password"],
-                    role,
-                    1 if row["is_active"] else 0,
-                    now_iso()
-                )
-            )
-        conn.execute("DROP TABLE users_legacy")
 
     if _table_exists(conn, "incidents") and not _has_column(conn, "incidents", "incident_id"):
         conn.execute("ALTER TABLE incidents RENAME TO incidents_legacy")
@@ -219,86 +721,470 @@ def _migrate_legacy_schema(conn):
                 status TEXT NOT NULL DEFAULT 'Open Case',
                 modified_by TEXT NOT NULL,
                 modified_at TEXT NOT NULL,
-                is_deleted INTEGER NOT NULL DEFAULT 0
+                is_deleted INTEGER NOT NULL DEFAULT 0,
+                start_ts INTEGER,
+                end_ts INTEGER
             )
             """
         )
-        rows = conn.execute(
+
+    if _table_exists(conn, "delete_requests") and not _has_column(conn, "delete_requests", "status"):
+        conn.execute("ALTER TABLE delete_requests RENAME TO delete_requests_legacy")
+        conn.execute(
             """
-            SELECT id, error, component, root_cause, action_taken, start_time, end_time, downtime, status, created_by, modified
-            FROM incidents_legacy
+            CREATE TABLE delete_requests(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                incident_id TEXT NOT NULL,
+                requested_by TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'Pending',
+                approver TEXT,
+                requested_at TEXT NOT NULL,
+                approved_at TEXT
+            )
             """
-        ).fetchall()
-        for row in rows:
-            incident_id = f"LEGACY-{row['id']}"
+        )
+
+    if _table_exists(conn, "incidents") and not _has_column(conn, "incidents", "start_ts"):
+        conn.execute("ALTER TABLE incidents ADD COLUMN start_ts INTEGER")
+        conn.execute("ALTER TABLE incidents ADD COLUMN end_ts INTEGER")
+        _backfill_incident_timestamps(conn)
+
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_incidents_live_start_ts
+        ON incidents(start_ts)
+        WHERE is_deleted=0
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_incidents_live_end_ts
+        ON incidents(end_ts)
+        WHERE is_deleted=0
+        """
+    )
+
+
+def _copy_legacy_chunk(conn, legacy_table, statements, chunk_size):
+    state = conn.execute(
+        "SELECT last_rowid, copied, total FROM legacy_migration_progress WHERE table_name=?",
+        (legacy_table,)
+    ).fetchone()
+    hi = conn.execute(
+        f"SELECT MAX(rowid) AS hi FROM (SELECT rowid FROM {legacy_table} WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+        (state["last_rowid"], chunk_size)
+    ).fetchone()["hi"]
+    if hi is None:
+        return None, state["copied"], state["total"]
+
+    params = {"now": now_iso(), "lo": state["last_rowid"], "hi": hi}
+    copied = 0
+    for index, sql in enumerate(statements):
+        cursor = conn.execute(sql, params)
+        if index == 0:
+            copied = cursor.rowcount
+    conn.execute(
+        "UPDATE legacy_migration_progress SET last_rowid=?, copied=copied + ? WHERE table_name=?",
+        (hi, copied, legacy_table)
+    )
+    return hi, state["copied"] + copied, state["total"]
+
+
+def copy_legacy_tables(chunk_size=LEGACY_COPY_CHUNK_SIZE, progress=None):
+    copied_tables = []
+    for legacy_table, statements in LEGACY_COPIES:
+        with tx(immediate=True) as conn:
+            if not _table_exists(conn, legacy_table):
+                continue
             conn.execute(
                 """
-                INSERT INTO incidents(
-                    incident_id, error_name, component, root_cause, remark, action_taken,
-                    start_date, start_time, end_date, end_time, duration_minutes, status,
-                    modified_by, modified_at, is_deleted
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-                """,
-                (
-                    incident_id,
-                    normalize_text(row["error"]),
-                    normalize_text(row["component"]),
-                    normalize_text(row["root_cause"]),
-                    "",
-                    normalize_text(row["action_taken"]),
-                    "",
-                    "",
-                    "",
-                    "",
-                    int(row["downtime"] or 0),
-                    row["status"] if row["status"] in INCIDENT_STATUSES else "Open Case",
-                    normalize_text(row["created_by"]) or "legacy",
-                    normalize_text(row["modified"]) or now_iso()
+                CREATE TABLE IF NOT EXISTS legacy_migration_progress(
+                    table_name TEXT PRIMARY KEY,
+                    last_rowid INTEGER NOT NULL,
+                    copied INTEGER NOT NULL,
+                    total INTEGER NOT NULL
                 )
+                """
             )
+            total = conn.execute(f"SELECT COUNT(*) AS n FROM {legacy_table}").fetchone()["n"]
             conn.execute(
-                "INSERT OR IGNORE INTO incident_registry(incident_id, created_at) VALUES (?, ?)",
-                (incident_id, now_iso())
+                """
+                INSERT OR IGNORE INTO legacy_migration_progress(table_name, last_rowid, copied, total)
+                VALUES (?, 0, 0, ?)
+                """,
+                (legacy_table, total)
             )
-        conn.execute("DROP TABLE incidents_legacy")
 
-    if _table_exists(conn, "delete_requests") and not _has_column(conn, "delete_requests", "status"):
-        conn.execute("ALTER TABLE delete_requests RENAME TO delete_requests_legacy")
-        conn.execute(
-            """
-            CREATE TABLE delete_requests(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                incident_id TEXT NOT NULL,
-                requested_by TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Pending',
-                approver TEXT,
-                requested_at TEXT NOT NULL,
-                approved_at TEXT
-            )
-            """
+        while True:
+            with tx(immediate=True) as conn:
+                hi, copied, total = _copy_legacy_chunk(conn, legacy_table, statements, chunk_size)
+                if hi is None:
+                    conn.execute(f"DROP TABLE {legacy_table}")
+                    conn.execute("DELETE FROM legacy_migration_progress WHERE table_name=?", (legacy_table,))
+            if hi is None:
+                break
+            if progress:
+                progress(f"{legacy_table}: {copied}/{total} rows copied")
+        copied_tables.append(legacy_table)
+
+    if copied_tables:
+        with tx(immediate=True) as conn:
+            remaining = conn.execute("SELECT COUNT(*) AS n FROM legacy_migration_progress").fetchone()["n"]
+            if not remaining:
+                conn.execute("DROP TABLE legacy_migration_progress")
+    return copied_tables
+
+
+def estimate_legacy_migration(sample_rows=2000):
+    estimates = []
+    with get_pool().writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Rehearse the renames and a sample copy, then roll everything back.
+            _migration_base_tables(conn)
+            for legacy_table, statements in LEGACY_COPIES:
+                if not _table_exists(conn, legacy_table):
+                    continue
+                total = conn.execute(f"SELECT COUNT(*) AS n FROM {legacy_table}").fetchone()["n"]
+                hi = conn.execute(
+                    f"SELECT MAX(rowid) AS hi FROM (SELECT rowid FROM {legacy_table} ORDER BY rowid LIMIT ?)",
+                    (sample_rows,)
+                ).fetchone()["hi"]
+                sampled = 0
+                elapsed = 0.0
+                if hi is not None:
+                    params = {"now": now_iso(), "lo": 0, "hi": hi}
+                    started = time.perf_counter()
+                    for index, sql in enumerate(statements):
+                        cursor = conn.execute(sql, params)
+                        if index == 0:
+                            sampled = cursor.rowcount
+                    elapsed = time.perf_counter() - started
+                per_row = elapsed / sampled if sampled else 0.0
+                estimates.append({
+                    "table": legacy_table,
+                    "rows": total,
+                    "sample_rows": sampled,
+                    "estimated_seconds": round(per_row * total, 2)
+                })
+        finally:
+            conn.rollback()
+    return estimates
+
+
+def _backfill_incident_timestamps(conn, chunk_size=5000):
+    cursor = conn.execute(
+        """
+        SELECT id, start_date, start_time, end_date, end_time
+        FROM incidents
+        WHERE start_ts IS NULL AND start_date != ''
+        """
+    )
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            try:
+                start_dt, end_dt, _ = calculate_duration_minutes(
+                    row["start_date"], row["start_time"], row["end_date"], row["end_time"]
+                )
+            except ValueError:
+                continue
+            updates.append((to_epoch(start_dt), to_epoch(end_dt), row["id"]))
+        conn.executemany("UPDATE incidents SET start_ts=?, end_ts=? WHERE id=?", updates)
+
+
+MIGRATIONS = [
+    (1, "base_tables", _migration_base_tables),
+    (2, "incident_search_index", _create_search_index),
+    (3, "dashboard_summary", _create_dashboard_summary),
+    (4, "incident_id_sequences", _migration_id_sequences),
+    (5, "lookup_indexes", _migration_lookup_indexes),
+    (6, "sessions", _migration_sessions),
+    (7, "signed_tokens", _migration_signed_tokens),
+    (8, "audit_archive", _migration_audit_archive),
+    (9, "audit_archive_targets", _migration_audit_archive_targets),
+    (10, "user_versions", _migration_user_versions),
+    (11, "audit_archive_purges", _migration_audit_archive_purges),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version():
+    with connect() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+@contextmanager
+def _migration_lock():
+    lock_path = f"{DB_NAME}.migrate.lock"
+    with open(lock_path, "a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def migrate(progress=None):
+    applied = []
+    with _migration_lock():
+        # Finish any legacy copy interrupted by a crash before moving on.
+        copy_legacy_tables(progress=progress)
+        current = schema_version()
+        for version, name, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            if progress:
+                progress(f"Applying migration {version}: {name}")
+            with tx(immediate=True) as conn:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+            copy_legacy_tables(progress=progress)
+            applied.append(name)
+    return applied
+
+
+def create_tables():
+    # A current database costs one integer read; DDL only runs when behind.
+    if schema_version() >= SCHEMA_VERSION:
+        return []
+    return migrate()
+
+
+_INSERT_AUDIT_SQL = """
+    INSERT INTO audit_logs(actor, action, target_type, target_id, details, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _pending_audit():
+    rows = getattr(_audit_buffer, "rows", None)
+    if rows is None:
+        rows = _audit_buffer.rows = []
+    return rows
+
+
+def _flush_audit(conn):
+    rows = _pending_audit()
+    if rows:
+        conn.executemany(_INSERT_AUDIT_SQL, rows)
+        rows.clear()
+
+
+def _discard_audit():
+    _pending_audit().clear()
+
+
+def _drop_buffered_audit(target_type, target_id):
+    rows = _pending_audit()
+    rows[:] = [row for row in rows if (row[2], row[3]) != (target_type, target_id)]
+
+
+def log_audit(conn, actor, action, target_type, target_id="", details=""):
+    row = (actor, action, target_type, target_id, details, now_iso())
+    if not conn.in_transaction:
+        conn.execute(_INSERT_AUDIT_SQL, row)
+        return
+    # Written in one batch just before the surrounding transaction commits.
+    _pending_audit().append(row)
+
+
+_AUDIT_COLUMNS = "id, actor, action, target_type, target_id, details, created_at"
+_AUDIT_ARCHIVE_FILE = re.compile(r"^audit_(\d{4}-\d{2})\.db$")
+
+
+def _audit_archive_dir(archive_dir=None):
+    return archive_dir or AUDIT_ARCHIVE_DIR or os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "audit_archive")
+
+
+def audit_archive_path(month, archive_dir=None):
+    return os.path.abspath(os.path.join(_audit_archive_dir(archive_dir), f"audit_{month}.db"))
+
+
+def list_audit_archives(archive_dir=None):
+    directory = _audit_archive_dir(archive_dir)
+    if not os.path.isdir(directory):
+        return []
+    archives = []
+    for name in sorted(os.listdir(directory)):
+        match = _AUDIT_ARCHIVE_FILE.match(name)
+        if match:
+            archives.append((match.group(1), os.path.abspath(os.path.join(directory, name))))
+    return archives
+
+
+def _connect_audit_archive(path, mode="rw"):
+    # Opens an existing archive without creating the file or its schema.
+    return sqlite3.connect(f"file:{path}?mode={mode}", uri=True, timeout=BUSY_TIMEOUT_SECONDS)
+
+
+def _index_archived_targets(conn, targets, path):
+    conn.executemany(
+        "INSERT OR IGNORE INTO audit_archive_targets(target_type, target_id, path) VALUES (?, ?, ?)",
+        [(target_type, target_id, path) for target_type, target_id in targets]
+    )
+
+
+def _open_audit_archive(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_logs(
+            id INTEGER PRIMARY KEY,
+            actor TEXT NOT NULL,
+            action TEXT NOT NULL,
+            target_type TEXT NOT NULL,
+            target_id TEXT,
+            details TEXT,
+            created_at TEXT NOT NULL
         )
-        rows = conn.execute(
-            "SELECT incident_id, requested_by FROM delete_requests_legacy"
-        ).fetchall()
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_target
+        ON audit_logs(target_type, target_id)
+        """
+    )
+    return conn
+
+
+def archive_audit_logs(before_month, archive_dir=None, chunk_size=AUDIT_ARCHIVE_CHUNK_SIZE, progress=None):
+    # Moves audit rows older than before_month (YYYY-MM) into one SQLite file
+    # per month. Rows are copied and committed to the archive before they are
+    # deleted here, and keep their ids, so an interrupted run can be repeated.
+    try:
+        datetime.strptime(before_month, "%Y-%m")
+    except (TypeError, ValueError):
+        raise ValueError("Month must be in YYYY-MM format.")
+    os.makedirs(_audit_archive_dir(archive_dir), exist_ok=True)
+    cutoff = f"{before_month}-01"
+    purge_pending_archived_audit()
+    moved = {}
+    while True:
+        with connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT {_AUDIT_COLUMNS}
+                FROM audit_logs
+                WHERE created_at < ?
+                ORDER BY created_at, id
+                LIMIT ?
+                """,
+                (cutoff, int(chunk_size))
+            ).fetchall()
+        if not rows:
+            return moved
+
+        by_month = {}
         for row in rows:
+            by_month.setdefault(row["created_at"][:7], []).append(tuple(row))
+        targets = {}
+        for month, month_rows in by_month.items():
+            path = audit_archive_path(month, archive_dir)
+            targets[path] = {(row[3], row[4]) for row in month_rows if row[4]}
+            archive = _open_audit_archive(path)
+            try:
+                with archive:
+                    archive.executemany(
+                        f"INSERT OR IGNORE INTO audit_logs({_AUDIT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        month_rows
+                    )
+            finally:
+                archive.close()
+            moved[month] = moved.get(month, 0) + len(month_rows)
+
+        ids = [(row["id"],) for row in rows]
+
+        def op(conn):
+            conn.executemany("DELETE FROM audit_logs WHERE id=?", ids)
+            for path, path_targets in targets.items():
+                _index_archived_targets(conn, path_targets, path)
+
+        write(op)
+        if progress:
+            progress(f"Archived {sum(moved.values())} audit rows.")
+
+
+def _purge_archived_audit(target_type, target_id, paths):
+    # Runs after the approval has committed. The pending purge row is only
+    # cleared once every archive is done, so failures are retried by the next
+    # archive-audit run. The INCIDENT_DELETE_FINAL tombstone is always kept.
+    purged = []
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                archive = _connect_audit_archive(path)
+                try:
+                    with archive:
+                        archive.execute(
+                            """
+                            DELETE FROM audit_logs
+                            WHERE target_type=? AND target_id=? AND action <> 'INCIDENT_DELETE_FINAL'
+                            """,
+                            (target_type, target_id)
+                        )
+                finally:
+                    archive.close()
+        except sqlite3.Error as exc:
+            audit_logger.warning("could not purge %s %s from %s: %s", target_type, target_id, path, exc)
+            continue
+        purged.append(path)
+
+    def op(conn):
+        conn.executemany(
+            "DELETE FROM audit_archive_targets WHERE target_type=? AND target_id=? AND path=?",
+            [(target_type, target_id, path) for path in purged]
+        )
+        if len(purged) == len(paths):
             conn.execute(
-                """
-                INSERT INTO delete_requests(incident_id, requested_by, status, requested_at)
-                VALUES (?, ?, 'Pending', ?)
-                """,
-                (str(row["incident_id"]), row["requested_by"], now_iso())
+                "DELETE FROM audit_archive_purges WHERE target_type=? AND target_id=?",
+                (target_type, target_id)
             )
-        conn.execute("DROP TABLE delete_requests_legacy")
 
+    write(op)
+
+
+def _archived_target_paths(conn, target_type, target_id):
+    return [
+        row["path"]
+        for row in conn.execute(
+            "SELECT path FROM audit_archive_targets WHERE target_type=? AND target_id=?",
+            (target_type, target_id)
+        ).fetchall()
+    ]
 
-def log_audit(conn, actor, action, target_type, target_id="", details=""):
-    conn.execute(
-        """
-        INSERT INTO audit_logs(actor, action, target_type, target_id, details, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (actor, action, target_type, target_id, details, now_iso())
-    )
+
+def purge_pending_archived_audit():
+    with connect() as conn:
+        pending = [
+            (row["target_type"], row["target_id"], _archived_target_paths(conn, row["target_type"], row["target_id"]))
+            for row in conn.execute("SELECT target_type, target_id FROM audit_archive_purges").fetchall()
+        ]
+    for target_type, target_id, paths in pending:
+        _purge_archived_audit(target_type, target_id, paths)
+    return len(pending)
 
 
 def get_user(username):
@@ -314,8 +1200,52 @@ def get_user(username):
         return dict(row) if row else None
 
 
+def get_user_profile(username):
+    with connect() as conn:
+        row = conn.execute(
+            """
+            SELECT username, full_name, role, is_active, role_version
+            FROM users
+            WHERE username=?
+            """,
+            (normalize_text(username),)
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def list_user_profiles(changed_since=None):
+    with connect() as conn:
+        if changed_since is None:
+            rows = conn.execute(
+                "SELECT username, full_name, role, is_active, role_version FROM users"
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                """
+                SELECT username, full_name, role, is_active, role_version
+                FROM users
+                WHERE role_version > ?
+                """,
+                (changed_since,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_user_change_listeners = []
+
+
+def add_user_change_listener(callback):
+    if callback not in _user_change_listeners:
+        _user_change_listeners.append(callback)
+
+
+def _notify_user_changed(username):
+    for callback in list(_user_change_listeners):
+        callback(username)
+
+
 def create_user(full_name, email, username, password_hash):
-    with tx(immediate=True) as conn:
+    def op(conn):
         conn.execute(
             """
             INSERT INTO users(full_name, email, username, password_hash, role, is_active, created_at)
@@ -325,15 +1255,26 @@ def create_user(full_name, email, username, password_hash):
         )
         log_audit(conn, normalize_text(username), "REGISTER", "USER", normalize_text(username), "User registered with no role.")
 
+    write(op)
 
-def list_users():
+
+def list_users(limit=None, after=None):
+    # Keyset pagination: pass the last username of a page as `after`.
+    where_sql = "WHERE username > ?" if after else ""
+    params = [after] if after else []
+    limit_sql = "LIMIT ?" if limit else ""
+    if limit:
+        params.append(max(1, int(limit)))
     with connect() as conn:
         rows = conn.execute(
-            """
+            f"""
             SELECT full_name, email, username, role, is_active
             FROM users
+            {where_sql}
             ORDER BY username
-            """
+            {limit_sql}
+            """,
+            params
         ).fetchall()
         return [dict(r) for r in rows]
 
@@ -341,7 +1282,8 @@ def list_users():
 def assign_role(actor_username, target_username, new_role):
     if new_role not in ASSIGNABLE_ROLES:
         raise ValueError("Invalid role assignment.")
-    with tx(immediate=True) as conn:
+
+    def op(conn):
         actor = conn.execute("SELECT role FROM users WHERE username=?", (actor_username,)).fetchone()
         if not actor or actor["role"] != "Manager":
             raise ValueError("Only Manager can assign roles.")
@@ -357,7 +1299,7 @@ def assign_role(actor_username, target_username, new_role):
 
         old_role = target["role"]
         conn.execute(
-            "UPDATE users SET role=? WHERE username=?",
+            "UPDATE users SET role=?, role_version=(SELECT MAX(role_version) FROM users) + 1 WHERE username=?",
             (new_role, target_username)
         )
         log_audit(
@@ -369,9 +1311,12 @@ def assign_role(actor_username, target_username, new_role):
             f"{old_role} -> {new_role}"
         )
 
+    write(op)
+    _notify_user_changed(target_username)
+
 
 def set_user_active(actor_username, target_username, is_active):
-    with tx(immediate=True) as conn:
+    def op(conn):
         actor = conn.execute("SELECT role FROM users WHERE username=?", (actor_username,)).fetchone()
         if not actor or actor["role"] != "Manager":
             raise ValueError("Only Manager can manage account status.")
@@ -386,7 +1331,7 @@ def set_user_active(actor_username, target_username, is_active):
             raise ValueError("Manager cannot modify own account status.")
 
         conn.execute(
-            "UPDATE users SET is_active=? WHERE username=?",
+            "UPDATE users SET is_active=?, role_version=(SELECT MAX(role_version) FROM users) + 1 WHERE username=?",
             (1 if is_active else 0, target_username)
         )
         log_audit(
@@ -398,6 +1343,101 @@ def set_user_active(actor_username, target_username, is_active):
             f"is_active -> {1 if is_active else 0}"
         )
 
+    write(op)
+    _notify_user_changed(target_username)
+
+
+def create_session(token_hash, username, created_at, expires_at):
+    def op(conn):
+        conn.execute(
+            "INSERT INTO sessions(token_hash, username, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (token_hash, username, int(created_at), int(expires_at))
+        )
+
+    write(op)
+
+
+def get_session(token_hash):
+    with connect() as conn:
+        return conn.execute(
+            "SELECT username, created_at, expires_at FROM sessions WHERE token_hash=?",
+            (token_hash,)
+        ).fetchone()
+
+
+def count_live_sessions(now):
+    with connect() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) AS n FROM sessions WHERE expires_at > ?",
+            (int(now),)
+        ).fetchone()["n"]
+
+
+def touch_session(token_hash, expires_at):
+    def op(conn):
+        conn.execute(
+            "UPDATE sessions SET expires_at=? WHERE token_hash=?",
+            (int(expires_at), token_hash)
+        )
+
+    write(op)
+
+
+def delete_session(token_hash):
+    def op(conn):
+        conn.execute("DELETE FROM sessions WHERE token_hash=?", (token_hash,))
+
+    write(op)
+
+
+def delete_expired_sessions(now, batch_size=1000):
+    def op(conn):
+        return conn.execute(
+            """
+            DELETE FROM sessions
+            WHERE token_hash IN (
+                SELECT token_hash FROM sessions WHERE expires_at <= ? LIMIT ?
+            )
+            """,
+            (int(now), batch_size)
+        ).rowcount
+
+    deleted = 0
+    while True:
+        count = write(op)
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def revoke_token(jti, expires_at):
+    def op(conn):
+        conn.execute(
+            "INSERT OR IGNORE INTO revoked_tokens(jti, expires_at) VALUES (?, ?)",
+            (jti, int(expires_at))
+        )
+
+    write(op)
+
+
+def list_revoked_tokens(now):
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT jti FROM revoked_tokens WHERE expires_at > ?",
+            (int(now),)
+        ).fetchall()
+        return [row["jti"] for row in rows]
+
+
+def delete_expired_revocations(now):
+    def op(conn):
+        return conn.execute(
+            "DELETE FROM revoked_tokens WHERE expires_at <= ?",
+            (int(now),)
+        ).rowcount
+
+    return write(op)
+
 
 def get_login_attempt(username):
     with connect() as conn:
@@ -409,7 +1449,7 @@ def get_login_attempt(username):
 
 
 def register_login_failure(username, lock_after=5, lock_minutes=15):
-    with tx(immediate=True) as conn:
+    def op(conn):
         row = conn.execute(
             "SELECT failed_attempts FROM login_attempts WHERE username=?",
             (normalize_text(username),)
@@ -441,11 +1481,15 @@ def register_login_failure(username, lock_after=5, lock_minutes=15):
                 (normalize_text(username), attempts, now_iso())
             )
 
+    write(op)
+
 
 def clear_login_attempts(username):
-    with tx() as conn:
+    def op(conn):
         conn.execute("DELETE FROM login_attempts WHERE username=?", (normalize_text(username),))
 
+    write(op)
+
 
 def is_login_locked(username):
     with connect() as conn:
@@ -508,7 +1552,9 @@ def _validate_incident_payload(payload, allow_status=False):
         "end_date": normalize_text(payload["end_date"]),
         "end_time": normalize_text(payload["end_time"]),
         "duration_minutes": provided_duration,
-        "status": status
+        "status": status,
+        "start_ts": to_epoch(start_dt),
+        "end_ts": to_epoch(end_dt)
     }
 
 
@@ -519,14 +1565,24 @@ def _normalize_incident_id_input(value):
     return incident_id
 
 
-def _generate_incident_id(conn):
-    year = datetime.now().strftime("%Y")
+_GENERATED_ID_PATTERN = re.compile(r"INC-(\d{4})-(\d+)")
+MAX_ID_RESERVATION = 10000
+
+
+def _ensure_id_sequence(conn, year):
+    row = conn.execute(
+        "SELECT last_seq FROM incident_id_sequences WHERE year=?",
+        (year,)
+    ).fetchone()
+    if row:
+        return
+
+    # One-time seed per year from IDs issued before the sequence existed.
     prefix = f"INC-{year}-"
     rows = conn.execute(
         "SELECT incident_id FROM incident_registry WHERE incident_id LIKE ?",
         (f"{prefix}%",)
     ).fetchall()
-
     max_seq = 0
     for row in rows:
         value = row["incident_id"]
@@ -535,56 +1591,263 @@ def _generate_incident_id(conn):
         tail = value[len(prefix):]
         if tail.isdigit():
             max_seq = max(max_seq, int(tail))
+    conn.execute(
+        "INSERT OR IGNORE INTO incident_id_sequences(year, last_seq) VALUES (?, ?)",
+        (year, max_seq)
+    )
+
+
+def _allocate_sequence(conn, year, count):
+    _ensure_id_sequence(conn, year)
+    conn.execute(
+        "UPDATE incident_id_sequences SET last_seq=last_seq + ? WHERE year=?",
+        (count, year)
+    )
+    last_seq = conn.execute(
+        "SELECT last_seq FROM incident_id_sequences WHERE year=?",
+        (year,)
+    ).fetchone()["last_seq"]
+    return range(last_seq - count + 1, last_seq + 1)
+
+
+def _observe_incident_id(conn, incident_id):
+    match = _GENERATED_ID_PATTERN.fullmatch(incident_id)
+    if not match:
+        return
+    year, seq = match.group(1), int(match.group(2))
+    _ensure_id_sequence(conn, year)
+    conn.execute(
+        "UPDATE incident_id_sequences SET last_seq=MAX(last_seq, ?) WHERE year=?",
+        (seq, year)
+    )
+
+
+def _generate_incident_ids(conn, count):
+    year = datetime.now().strftime("%Y")
+    return [f"INC-{year}-{seq:04d}" for seq in _allocate_sequence(conn, year, count)]
+
+
+def _generate_incident_id(conn):
+    return _generate_incident_ids(conn, 1)[0]
 
-    return f"{prefix}{max_seq + 1:04d}"
+
+def reserve_incident_ids(count, actor_username):
+    count = int(count)
+    if count < 1 or count > MAX_ID_RESERVATION:
+        raise ValueError(f"Reservation size must be between 1 and {MAX_ID_RESERVATION}.")
+
+    def op(conn):
+        incident_ids = _generate_incident_ids(conn, count)
+        log_audit(
+            conn,
+            actor_username,
+            "INCIDENT_ID_RESERVE",
+            "INCIDENT",
+            incident_ids[0],
+            f"Reserved {count} incident IDs ending at {incident_ids[-1]}."
+        )
+        return incident_ids
+
+    return write(op)
 
 
 def _build_modified_by(actor_full_name):
     return f"{normalize_text(actor_full_name)} @ {datetime.now().strftime('%d/%m/%Y %I:%M %p')}"
 
 
+_INSERT_INCIDENT_SQL = """
+    INSERT INTO incidents(
+        incident_id, error_name, component, root_cause, remark, action_taken,
+        start_date, start_time, end_date, end_time, duration_minutes,
+        status, modified_by, modified_at, is_deleted, start_ts, end_ts
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Open Case', ?, ?, 0, ?, ?)
+"""
+
+
+def _incident_insert_params(clean, modified_by, modified_at):
+    return (
+        clean["incident_id"], clean["error_name"], clean["component"],
+        clean["root_cause"], clean["remark"], clean["action_taken"],
+        clean["start_date"], clean["start_time"], clean["end_date"], clean["end_time"],
+        clean["duration_minutes"], modified_by, modified_at,
+        clean["start_ts"], clean["end_ts"]
+    )
+
+
 def create_incident(payload, actor_username, actor_full_name):
-    try:
-        with tx(immediate=True) as conn:
-            prepared_payload = dict(payload or {})
-            prepared_payload["incident_id"] = normalize_text(prepared_payload.get("incident_id"))
-            if not prepared_payload["incident_id"]:
-                prepared_payload["incident_id"] = _generate_incident_id(conn)
+    def op(conn):
+        prepared_payload = dict(payload or {})
+        prepared_payload["incident_id"] = normalize_text(prepared_payload.get("incident_id"))
+        if not prepared_payload["incident_id"]:
+            prepared_payload["incident_id"] = _generate_incident_id(conn)
 
-            clean = _validate_incident_payload(prepared_payload, allow_status=False)
+        clean = _validate_incident_payload(prepared_payload, allow_status=False)
 
-            exists = conn.execute(
-                "SELECT 1 FROM incident_registry WHERE incident_id=?",
-                (clean["incident_id"],)
-            ).fetchone()
-            if exists:
-                raise ValueError("Incident ID already exists and cannot be reused.")
+        exists = conn.execute(
+            "SELECT 1 FROM incident_registry WHERE incident_id=?",
+            (clean["incident_id"],)
+        ).fetchone()
+        if exists:
+            raise ValueError("Incident ID already exists and cannot be reused.")
 
-            conn.execute(
-                "INSERT INTO incident_registry(incident_id, created_at) VALUES (?, ?)",
-                (clean["incident_id"], now_iso())
-            )
-            conn.execute(
-                """
-                INSERT INTO incidents(
-                    incident_id, error_name, component, root_cause, remark, action_taken,
-                    start_date, start_time, end_date, end_time, duration_minutes,
-                    status, modified_by, modified_at, is_deleted
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Open Case', ?, ?, 0)
-                """,
-                (
-                    clean["incident_id"], clean["error_name"], clean["component"],
-                    clean["root_cause"], clean["remark"], clean["action_taken"],
-                    clean["start_date"], clean["start_time"], clean["end_date"], clean["end_time"],
-                    clean["duration_minutes"], _build_modified_by(actor_full_name), now_iso()
-                )
-            )
-            log_audit(conn, actor_username, "INCIDENT_CREATE", "INCIDENT", clean["incident_id"], "Created incident.")
-            return clean["incident_id"]
+        conn.execute(
+            "INSERT INTO incident_registry(incident_id, created_at) VALUES (?, ?)",
+            (clean["incident_id"], now_iso())
+        )
+        _observe_incident_id(conn, clean["incident_id"])
+        conn.execute(
+            _INSERT_INCIDENT_SQL,
+            _incident_insert_params(clean, _build_modified_by(actor_full_name), now_iso())
+        )
+        log_audit(conn, actor_username, "INCIDENT_CREATE", "INCIDENT", clean["incident_id"], "Created incident.")
+        return clean["incident_id"]
+
+    try:
+        return write(op)
     except sqlite3.IntegrityError:
         raise ValueError("Incident ID already exists and cannot be reused.")
 
 
+BULK_CHUNK_SIZE = 500
+_PENDING_INCIDENT_ID = "PENDING"
+
+
+def _bulk_result(index, incident_id, error=None):
+    return {"row": index, "incident_id": incident_id or None, "ok": error is None, "error": error}
+
+
+def _prepare_bulk_chunk(items):
+    results = {}
+    prepared = []
+    seen = set()
+    for index, payload in items:
+        if isinstance(payload, Exception):
+            results[index] = _bulk_result(index, None, str(payload))
+            continue
+        if not isinstance(payload, dict):
+            results[index] = _bulk_result(index, None, "Row must be an object.")
+            continue
+
+        candidate = dict(payload)
+        incident_id = normalize_text(candidate.get("incident_id"))
+        candidate["incident_id"] = incident_id or _PENDING_INCIDENT_ID
+        try:
+            clean = _validate_incident_payload(candidate, allow_status=False)
+        except ValueError as exc:
+            results[index] = _bulk_result(index, incident_id, str(exc))
+            continue
+
+        if incident_id:
+            if incident_id in seen:
+                results[index] = _bulk_result(index, incident_id, "Incident ID is duplicated within the import.")
+                continue
+            seen.add(incident_id)
+        else:
+            clean["incident_id"] = None
+        prepared.append((index, clean))
+    return prepared, results
+
+
+def _insert_bulk_rows(conn, rows, modified_by, created_at):
+    conn.executemany(
+        "INSERT INTO incident_registry(incident_id, created_at) VALUES (?, ?)",
+        [(clean["incident_id"], created_at) for _, clean in rows]
+    )
+    conn.executemany(
+        _INSERT_INCIDENT_SQL,
+        [_incident_insert_params(clean, modified_by, created_at) for _, clean in rows]
+    )
+
+
+def _create_incident_chunk(items, actor_username, actor_full_name):
+    prepared, results = _prepare_bulk_chunk(items)
+    if not prepared:
+        return [results[i] for i in sorted(results)]
+
+    duplicate_error = "Incident ID already exists and cannot be reused."
+
+    def op(conn):
+        supplied = [clean["incident_id"] for _, clean in prepared if clean["incident_id"]]
+        existing = set()
+        if supplied:
+            placeholders = ", ".join("?" for _ in supplied)
+            existing = {
+                row["incident_id"]
+                for row in conn.execute(
+                    f"SELECT incident_id FROM incident_registry WHERE incident_id IN ({placeholders})",
+                    supplied
+                ).fetchall()
+            }
+
+        accepted = []
+        for index, clean in prepared:
+            if clean["incident_id"] in existing:
+                results[index] = _bulk_result(index, clean["incident_id"], duplicate_error)
+            else:
+                accepted.append((index, clean))
+
+        for incident_id in supplied:
+            if incident_id not in existing:
+                _observe_incident_id(conn, incident_id)
+        missing = [clean for _, clean in accepted if not clean["incident_id"]]
+        if missing:
+            for clean, incident_id in zip(missing, _generate_incident_ids(conn, len(missing))):
+                clean["incident_id"] = incident_id
+
+        modified_by = _build_modified_by(actor_full_name)
+        created_at = now_iso()
+        conn.execute("SAVEPOINT bulk_chunk")
+        try:
+            _insert_bulk_rows(conn, accepted, modified_by, created_at)
+            conn.execute("RELEASE bulk_chunk")
+            inserted = accepted
+        except sqlite3.IntegrityError:
+            # Retry row by row so one conflicting row does not sink the whole chunk.
+            conn.execute("ROLLBACK TO bulk_chunk")
+            conn.execute("RELEASE bulk_chunk")
+            inserted = []
+            for index, clean in accepted:
+                conn.execute("SAVEPOINT bulk_row")
+                try:
+                    _insert_bulk_rows(conn, [(index, clean)], modified_by, created_at)
+                    conn.execute("RELEASE bulk_row")
+                    inserted.append((index, clean))
+                except sqlite3.IntegrityError:
+                    conn.execute("ROLLBACK TO bulk_row")
+                    conn.execute("RELEASE bulk_row")
+                    results[index] = _bulk_result(index, clean["incident_id"], duplicate_error)
+        # Only rows that survived their savepoint are audited, in the same
+        # pre-commit batch as every other audit row.
+        _pending_audit().extend(
+            (actor_username, "INCIDENT_CREATE", "INCIDENT", clean["incident_id"], "Created incident (bulk import).", created_at)
+            for _, clean in inserted
+        )
+        return inserted
+
+    inserted = write(op)
+    for index, clean in inserted:
+        results[index] = _bulk_result(index, clean["incident_id"])
+    return [results[i] for i in sorted(results)]
+
+
+def iter_incidents_bulk(rows, actor_username, actor_full_name, chunk_size=BULK_CHUNK_SIZE, start_index=1):
+    # Yields one result per input row, a chunk at a time, so callers can
+    # summarize very large imports without holding every result.
+    chunk_size = min(max(1, int(chunk_size)), 900)
+    chunk = []
+    for index, payload in enumerate(rows, start_index):
+        chunk.append((index, payload))
+        if len(chunk) >= chunk_size:
+            yield from _create_incident_chunk(chunk, actor_username, actor_full_name)
+            chunk = []
+    if chunk:
+        yield from _create_incident_chunk(chunk, actor_username, actor_full_name)
+
+
+def create_incidents_bulk(rows, actor_username, actor_full_name, chunk_size=BULK_CHUNK_SIZE, start_index=1):
+    return list(iter_incidents_bulk(rows, actor_username, actor_full_name, chunk_size, start_index))
+
+
 def get_incident(incident_id):
     incident_id = _normalize_incident_id_input(incident_id)
     with connect() as conn:
@@ -599,57 +1862,157 @@ def get_incident(incident_id):
         return dict(row) if row else None
 
 
-def search_incidents(keyword, page, page_size):
-    key = normalize_text(keyword).lower()
-    like = f"%{key}%"
-    page = max(1, int(page))
-    page_size = max(1, int(page_size))
-    offset = (page - 1) * page_size
+_INCIDENT_ID_PATTERN = re.compile(r"(?:INC-)?\d{4}-\d{4,8}|LEGACY-\d+", re.IGNORECASE)
+
+
+def _fts_match_query(keyword):
+    tokens = re.findall(r"[^\W_]+", keyword.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
 
-    where_sql = "is_deleted=0"
+def _search_clause(keyword):
+    key = normalize_text(keyword)
+    if not key:
+        return "incidents i", "i.is_deleted=0", [], None
+
+    if _INCIDENT_ID_PATTERN.fullmatch(key):
+        incident_id = _normalize_incident_id_input(key)
+        return (
+            "incidents i",
+            "i.is_deleted=0 AND i.incident_id IN (?, ?)",
+            [incident_id, incident_id.upper()],
+            None
+        )
+
+    match = _fts_match_query(key)
+    if not match:
+        return "incidents i", "0", [], None
+    return (
+        "incidents_fts JOIN incidents i ON i.id = incidents_fts.rowid",
+        "incidents_fts MATCH ? AND i.is_deleted=0",
+        [match],
+        "bm25(incidents_fts)"
+    )
+
+
+def encode_search_cursor(row_id, rank=None):
+    data = {"id": int(row_id)}
+    if rank is not None:
+        data["rank"] = float(rank)
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        row_id = int(data["id"])
+        rank = float(data["rank"]) if data.get("rank") is not None else None
+    except Exception:
+        raise ValueError("Invalid search cursor.")
+    return row_id, rank
+
+
+def _date_range_clause(date_from=None, date_to=None):
+    where_sql = ""
     params = []
-    if key:
-        where_sql += """
-            AND (
-                lower(incident_id) LIKE ?
-                OR lower(error_name) LIKE ?
-                OR lower(component) LIKE ?
-                OR lower(root_cause) LIKE ?
-                OR lower(remark) LIKE ?
-                OR lower(action_taken) LIKE ?
-                OR lower(start_date) LIKE ?
-                OR lower(start_time) LIKE ?
-                OR lower(end_date) LIKE ?
-                OR lower(end_time) LIKE ?
-                OR lower(status) LIKE ?
-                OR lower(modified_by) LIKE ?
-            )
-        """
-        params.extend([like] * 12)
+    if date_from:
+        where_sql += " AND i.start_ts >= ?"
+        params.append(to_epoch(parse_filter_date(date_from)))
+    if date_to:
+        where_sql += " AND i.start_ts < ?"
+        params.append(to_epoch(parse_filter_date(date_to) + timedelta(days=1)))
+    return where_sql, params
+
+
+def search_incidents_page(keyword, page_size, page=1, after=None, total_mode="exact", date_from=None, date_to=None):
+    if total_mode not in SEARCH_TOTAL_MODES:
+        raise ValueError("Invalid total mode.")
+    page_size = max(1, int(page_size))
+    from_sql, where_sql, params, rank_sql = _search_clause(keyword)
+    range_sql, range_params = _date_range_clause(date_from, date_to)
+    where_sql += range_sql
+    params = [*params, *range_params]
+    order_sql = f"{rank_sql}, i.id DESC" if rank_sql else "i.id DESC"
+    rank_select = f"{rank_sql} AS _rank" if rank_sql else "NULL AS _rank"
+
+    page_where = where_sql
+    page_params = list(params)
+    offset = 0
+    if after:
+        after_id, after_rank = decode_search_cursor(after)
+        if rank_sql:
+            if after_rank is None:
+                raise ValueError("Invalid search cursor.")
+            page_where += f" AND ({rank_sql} > ? OR ({rank_sql} = ? AND i.id < ?))"
+            page_params.extend([after_rank, after_rank, after_id])
+        else:
+            page_where += " AND i.id < ?"
+            page_params.append(after_id)
+    else:
+        offset = (max(1, int(page)) - 1) * page_size
 
     with connect() as conn:
-        total = conn.execute(
-            f"SELECT COUNT(*) AS n FROM incidents WHERE {where_sql}",
-            params
-        ).fetchone()["n"]
+        total = None
+        total_exact = True
+        if total_mode == "exact":
+            total = conn.execute(
+                f"SELECT COUNT(*) AS n FROM {from_sql} WHERE {where_sql}",
+                params
+            ).fetchone()["n"]
+        elif total_mode == "estimate":
+            total = conn.execute(
+                f"SELECT COUNT(*) AS n FROM (SELECT 1 FROM {from_sql} WHERE {where_sql} LIMIT ?)",
+                [*params, SEARCH_ESTIMATE_CAP]
+            ).fetchone()["n"]
+            total_exact = total < SEARCH_ESTIMATE_CAP
+        else:
+            total_exact = False
+
         rows = conn.execute(
             f"""
-            SELECT incident_id, error_name, component, root_cause, remark, action_taken,
-                   start_date, start_time, end_date, end_time, duration_minutes, status,
-                   modified_by, modified_at
-            FROM incidents
-            WHERE {where_sql}
-            ORDER BY id DESC
+            SELECT i.id AS _id, {rank_select},
+                   i.incident_id, i.error_name, i.component, i.root_cause, i.remark, i.action_taken,
+                   i.start_date, i.start_time, i.end_date, i.end_time, i.duration_minutes, i.status,
+                   i.modified_by, i.modified_at
+            FROM {from_sql}
+            WHERE {page_where}
+            ORDER BY {order_sql}
             LIMIT ? OFFSET ?
             """,
-            [*params, page_size, offset]
+            [*page_params, page_size + 1, offset]
         ).fetchall()
-        return total, [dict(r) for r in rows]
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_search_cursor(last["_id"], last["_rank"])
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        item.pop("_id")
+        item.pop("_rank")
+        items.append(item)
+    return {
+        "total": total,
+        "total_exact": total_exact,
+        "rows": items,
+        "next_cursor": next_cursor
+    }
+
+
+def search_incidents(keyword, page, page_size, date_from=None, date_to=None):
+    result = search_incidents_page(keyword, page_size, page=page, date_from=date_from, date_to=date_to)
+    return result["total"], result["rows"]
 
 
 def update_incident(incident_id, updates, actor_username, actor_full_name):
     incident_id = _normalize_incident_id_input(incident_id)
-    with tx(immediate=True) as conn:
+
+    def op(conn):
         pending = conn.execute(
             "SELECT 1 FROM delete_requests WHERE incident_id=? AND status='Pending'",
             (normalize_text(incident_id),)
@@ -727,24 +2090,30 @@ def update_incident(incident_id, updates, actor_username, actor_full_name):
                 duration_minutes=?,
                 status=?,
                 modified_by=?,
-                modified_at=?
+                modified_at=?,
+                start_ts=?,
+                end_ts=?
             WHERE incident_id=? AND is_deleted=0
             """,
             (
                 clean["root_cause"], clean["remark"], clean["action_taken"],
                 clean["start_date"], clean["start_time"], clean["end_date"],
                 clean["end_time"], clean["duration_minutes"], clean["status"],
-                _build_modified_by(actor_full_name), now_iso(), clean["incident_id"]
+                _build_modified_by(actor_full_name), now_iso(),
+                clean["start_ts"], clean["end_ts"], clean["incident_id"]
             )
         )
         log_audit(conn, actor_username, "INCIDENT_UPDATE", "INCIDENT", clean["incident_id"], "Updated incident fields.")
 
+    write(op)
+
 
 def request_delete_incident(incident_id, actor_username, actor_role):
     incident_id = _normalize_incident_id_input(incident_id)
     if actor_role != "CS Leader":
         raise ValueError("Only CS Leader can submit delete requests.")
-    with tx(immediate=True) as conn:
+
+    def op(conn):
         row = conn.execute(
             "SELECT 1 FROM incidents WHERE incident_id=? AND is_deleted=0",
             (incident_id,)
@@ -768,15 +2137,26 @@ def request_delete_incident(incident_id, actor_username, actor_role):
         )
         log_audit(conn, actor_username, "DELETE_REQUEST_CREATE", "INCIDENT", incident_id, "Delete request submitted.")
 
+    write(op)
 
-def list_delete_requests():
+
+def list_delete_requests(limit=None, after=None):
+    # Keyset pagination: pass the last id of a page as `after`.
+    where_sql = "WHERE id < ?" if after else ""
+    params = [int(after)] if after else []
+    limit_sql = "LIMIT ?" if limit else ""
+    if limit:
+        params.append(max(1, int(limit)))
     with connect() as conn:
         rows = conn.execute(
-            """
-            SELECT incident_id, requested_by, status, approver, requested_at, approved_at
+            f"""
+            SELECT id, incident_id, requested_by, status, approver, requested_at, approved_at
             FROM delete_requests
+            {where_sql}
             ORDER BY id DESC
-            """
+            {limit_sql}
+            """,
+            params
         ).fetchall()
         return [dict(r) for r in rows]
 
@@ -786,7 +2166,7 @@ def approve_delete_request(incident_id, actor_username, actor_role):
     if actor_role not in ["CS Leader", "Manager"]:
         raise ValueError("Only CS Leader and Manager can approve delete requests.")
 
-    with tx(immediate=True) as conn:
+    def op(conn):
         req = conn.execute(
             """
             SELECT id, status
@@ -829,7 +2209,19 @@ def approve_delete_request(incident_id, actor_username, actor_role):
             "DELETE FROM audit_logs WHERE target_type='INCIDENT' AND target_id=?",
             (incident_id,)
         )
+        _drop_buffered_audit("INCIDENT", incident_id)
         log_audit(conn, actor_username, "INCIDENT_DELETE_FINAL", "INCIDENT", incident_id, "Incident permanently deleted.")
+        paths = _archived_target_paths(conn, "INCIDENT", incident_id)
+        if paths:
+            conn.execute(
+                "INSERT OR IGNORE INTO audit_archive_purges(target_type, target_id) VALUES ('INCIDENT', ?)",
+                (incident_id,)
+            )
+        return paths
+
+    paths = write(op)
+    if paths:
+        _purge_archived_audit("INCIDENT", incident_id, paths)
 
 
 def get_change_logs(incident_id):
@@ -860,3 +2252,48 @@ def get_all_incidents():
             """
         ).fetchall()
         return [dict(r) for r in rows]
+
+
+EXPORT_COLUMNS = [
+    "incident_id", "error_name", "component", "root_cause", "action_taken",
+    "start_date", "start_time", "end_date", "end_time",
+    "duration_minutes", "status", "modified_by", "modified_at"
+]
+EXPORT_CHUNK_SIZE = 1000
+
+
+def iter_incident_chunks(keyword="", date_from=None, date_to=None, chunk_size=EXPORT_CHUNK_SIZE):
+    from_sql, where_sql, params, _ = _search_clause(keyword)
+    range_sql, range_params = _date_range_clause(date_from, date_to)
+    where_sql += range_sql
+    params = [*params, *range_params]
+    columns = ", ".join(f"i.{c}" for c in EXPORT_COLUMNS)
+    chunk_size = max(1, int(chunk_size))
+    return _iter_chunks(from_sql, where_sql, params, columns, chunk_size)
+
+
+def _iter_chunks(from_sql, where_sql, params, columns, chunk_size):
+    # Each chunk is a separate keyset query, so no connection or read snapshot
+    # is held while the consumer is busy writing the previous chunk out.
+    last_id = None
+    while True:
+        seek_sql = " AND i.id < ?" if last_id is not None else ""
+        seek_params = [last_id] if last_id is not None else []
+        with connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT i.id AS _id, {columns}
+                FROM {from_sql}
+                WHERE {where_sql}{seek_sql}
+                ORDER BY i.id DESC
+                LIMIT ?
+                """,
+                [*params, *seek_params, chunk_size]
+            ).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1]["_id"]
+        yield [tuple(row)[1:] for row in rows]
+        if len(rows) < chunk_size:
+            return
+
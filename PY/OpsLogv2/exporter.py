@@ -1,29 +1,96 @@
-import pandas as pd
-from database import get_all_incidents
-
-
-def export_to_excel() -> str:
-    rows = get_all_incidents()
-    df = pd.DataFrame(rows)
-    column_aliases = {
-        "incident_id": "Incident ID",
-        "error_name": "Error Name",
-        "component": "Component",
-        "root_cause": "Root Cause",
-        "action_taken": "Action Taken",
-        "start_date": "Start Date",
-        "start_time": "Start Time",
-        "end_date": "End Date",
-        "end_time": "End Time",
-        "duration_minutes": "Duration (Minutes)",
-        "status": "Status",
-        "modified_by": "Modified By",
-        "modified_at": "Modified At",
-    }
-    if not df.empty:
-        df = df.rename(columns=column_aliases)
-
-    file_name = "incident_report.xlsx"
-    df.to_excel(file_name, index=False)
+import csv
+import io
+import json
+import os
+import tempfile
 
+from database import EXPORT_COLUMNS, iter_incident_chunks
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+COLUMN_ALIASES = {
+    "incident_id": "Incident ID",
+    "error_name": "Error Name",
+    "component": "Component",
+    "root_cause": "Root Cause",
+    "action_taken": "Action Taken",
+    "start_date": "Start Date",
+    "start_time": "Start Time",
+    "end_date": "End Date",
+    "end_time": "End Time",
+    "duration_minutes": "Duration (Minutes)",
+    "status": "Status",
+    "modified_by": "Modified By",
+    "modified_at": "Modified At",
+}
+
+EXPORT_HEADERS = [COLUMN_ALIASES.get(c, c) for c in EXPORT_COLUMNS]
+
+
+def stream_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def write_xlsx(chunks, target):
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to the package instead of building a sheet in memory.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Incidents")
+    sheet.append(EXPORT_HEADERS)
+    for rows in chunks:
+        for row in rows:
+            sheet.append(row)
+    workbook.save(target)
+
+
+def stream_xlsx(chunks, read_size=64 * 1024):
+    with tempfile.TemporaryFile() as spool:
+        write_xlsx(chunks, spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(read_size)
+            if not data:
+                break
+            yield data
+
+
+def stream_export(fmt, keyword="", date_from=None, date_to=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}.")
+    chunks = iter_incident_chunks(keyword, date_from=date_from, date_to=date_to)
+    if fmt == "csv":
+        return stream_csv(chunks)
+    if fmt == "ndjson":
+        return stream_ndjson(chunks)
+    return stream_xlsx(chunks)
+
+
+def export_to_excel(file_name=None) -> str:
+    if not file_name:
+        fd, file_name = tempfile.mkstemp(prefix="incident_report_", suffix=".xlsx", dir=os.getcwd())
+        os.close(fd)
+    write_xlsx(iter_incident_chunks(), file_name)
     return file_name
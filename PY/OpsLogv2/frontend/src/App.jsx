@@ -477,7 +477,7 @@ export default function App() {
           <div>
             <h2>Deletion Approvals</h2>
             <button onClick={fetchDeleteRequests}>Refresh Requests</button>
-            <DataTable rows={deleteRequests} />
+            <DataTable rows={deleteRequests.map(({ id, ...request }) => request)} />
             <div className="actions">
               {deleteRequests.filter((request) => request.status === "Pending").map((request) => (
                 <button key={request.incident_id} onClick={() => approveDelete(request.incident_id)}>
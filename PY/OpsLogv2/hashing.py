@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+import request_timing
+from metrics import REGISTRY
+from utils import hash_password, verify_password
+
+
+HASH_WORKERS = int(os.environ.get("OPSLOG_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.environ.get("OPSLOG_HASH_QUEUE_LIMIT", "64"))
+
+_lock = Lock()
+_executor = None
+_pending = 0
+
+HASH_LATENCY = REGISTRY.histogram(
+    "opslog_password_hash_seconds",
+    "Time from submission to completion of a password hash or verify, including queueing.",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+HASH_REJECTED = REGISTRY.counter(
+    "opslog_password_hash_rejected_total",
+    "Password hash requests rejected because the hashing queue was full.",
+    ("operation",),
+)
+HASH_QUEUE_DEPTH = REGISTRY.gauge(
+    "opslog_password_hash_queue_depth",
+    "Password hash requests submitted and not yet completed.",
+    callback=lambda: _pending,
+)
+
+
+class HashQueueFullError(RuntimeError):
+    pass
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Spawn rather than fork: the parent already runs DB and web threads.
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, HASH_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _submit(operation, fn, *args):
+    global _pending, _executor
+    with _lock:
+        if _pending >= HASH_QUEUE_LIMIT:
+            HASH_REJECTED.inc(operation=operation)
+            raise HashQueueFullError("Password hashing is busy. Please retry shortly.")
+        try:
+            future = _get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            _executor = None
+            future = _get_executor().submit(fn, *args)
+        _pending += 1
+
+    started = time.perf_counter()
+
+    def _done(_future):
+        global _pending
+        with _lock:
+            _pending -= 1
+        HASH_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    future.add_done_callback(_done)
+    return future
+
+
+async def hash_password_async(password):
+    with request_timing.phase("hash"):
+        return await asyncio.wrap_future(_submit("hash", hash_password, password))
+
+
+async def verify_password_async(password, stored_hash):
+    with request_timing.phase("hash"):
+        return await asyncio.wrap_future(_submit("verify", verify_password, password, stored_hash))
+
+
+def hashing_stats():
+    with _lock:
+        pending = _pending
+    return {
+        "workers": HASH_WORKERS,
+        "queue_limit": HASH_QUEUE_LIMIT,
+        "queue_depth": pending,
+        "rejected": HASH_REJECTED.value(operation="hash") + HASH_REJECTED.value(operation="verify"),
+    }
+
+
+def shutdown_hashing():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,49 @@
+import csv
+import json
+import re
+
+
+IMPORT_FORMATS = ["ndjson", "csv"]
+
+
+def _field_name(header):
+    return re.sub(r"[^a-z0-9]+", "_", (header or "").strip().lower()).strip("_")
+
+
+def iter_ndjson(lines):
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield ValueError(f"Line {line_no}: invalid JSON ({exc.msg}).")
+            continue
+        if not isinstance(row, dict):
+            yield ValueError(f"Line {line_no}: each line must be a JSON object.")
+            continue
+        yield {_field_name(k): v if v is None else str(v) for k, v in row.items()}
+
+
+def iter_csv(lines):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [_field_name(h) for h in header]
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        if len(values) != len(fields):
+            yield ValueError(f"Line {reader.line_num}: expected {len(fields)} columns, got {len(values)}.")
+            continue
+        yield dict(zip(fields, values))
+
+
+def iter_rows(lines, fmt):
+    if fmt == "ndjson":
+        return iter_ndjson(lines)
+    if fmt == "csv":
+        return iter_csv(lines)
+    raise ValueError(f"Unsupported import format: {fmt}.")
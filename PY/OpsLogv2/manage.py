@@ -0,0 +1,81 @@
+import argparse
+
+import database
+
+
+def cmd_migrate(args):
+    if args.status:
+        current = database.schema_version()
+        print(f"Schema version {current} of {database.SCHEMA_VERSION}.")
+        for version, name, _ in database.MIGRATIONS:
+            state = "applied" if version <= current else "pending"
+            print(f"  {version:>3} {name:<28} {state}")
+        return
+    if args.dry_run:
+        estimates = database.estimate_legacy_migration()
+        if not estimates:
+            print("No legacy tables to convert.")
+        for item in estimates:
+            print(
+                f"  {item['table']:<24} {item['rows']:>10} rows  "
+                f"~{item['estimated_seconds']}s (sampled {item['sample_rows']})"
+            )
+        return
+    applied = database.migrate(progress=print)
+    print(f"Applied {len(applied)} migration(s); schema is at version {database.schema_version()}.")
+
+
+def cmd_rebuild_search_index(args):
+    total = database.rebuild_search_index()
+    print(f"Search index rebuilt for {total} incidents.")
+
+
+def cmd_rebuild_dashboard_stats(args):
+    version = database.rebuild_dashboard_summary()
+    print(f"Dashboard statistics recomputed (version {version}).")
+
+
+def cmd_archive_audit(args):
+    moved = database.archive_audit_logs(args.before, archive_dir=args.dir, progress=print if args.verbose else None)
+    if not moved:
+        print(f"No audit rows older than {args.before}.")
+    for month in sorted(moved):
+        print(f"  {month} {moved[month]:>10} rows -> {database.audit_archive_path(month, args.dir)}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="OpsLog maintenance commands.")
+    parser.add_argument("--db", default=database.DB_NAME, help="SQLite database file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="Apply pending schema migrations.")
+    migrate.add_argument("--status", action="store_true", help="Only show applied and pending migrations.")
+    migrate.add_argument(
+        "--dry-run", action="store_true", help="Estimate the legacy data copy without changing the database."
+    )
+    migrate.set_defaults(func=cmd_migrate, skip_create=True)
+
+    rebuild = sub.add_parser("rebuild-search-index", help="Backfill and optimize the incident full-text index.")
+    rebuild.set_defaults(func=cmd_rebuild_search_index)
+
+    stats = sub.add_parser("rebuild-dashboard-stats", help="Recompute the materialized dashboard summary.")
+    stats.set_defaults(func=cmd_rebuild_dashboard_stats)
+
+    archive = sub.add_parser("archive-audit", help="Move old audit rows into per-month archive databases.")
+    archive.add_argument("--before", required=True, help="Archive rows created before this month (YYYY-MM).")
+    archive.add_argument("--dir", help="Archive directory (default: audit_archive next to the database).")
+    archive.add_argument("--verbose", action="store_true")
+    archive.set_defaults(func=cmd_archive_audit)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    database.DB_NAME = args.db
+    if not getattr(args, "skip_create", False):
+        database.create_tables()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from threading import Lock
+
+from metrics import REGISTRY
+
+
+SLOW_QUERY_MS = float(os.environ.get("OPSLOG_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_HISTORY = 100
+PLAN_CACHE_SECONDS = 60
+STATEMENT_LABEL_LENGTH = 160
+# Distinct statement labels exported; later statements share OTHER_STATEMENT.
+MAX_STATEMENT_LABELS = int(os.environ.get("OPSLOG_DB_MAX_STATEMENT_LABELS", "200"))
+OTHER_STATEMENT = "other"
+
+slow_query_logger = logging.getLogger("opslog.slow_query")
+
+STATEMENT_SECONDS = REGISTRY.histogram(
+    "opslog_db_statement_seconds",
+    "SQL statement latency from execute to the end of its first fetch.",
+    ("statement",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+STATEMENT_ROWS = REGISTRY.counter(
+    "opslog_db_statement_rows_total",
+    "Rows returned (SELECT) or changed (INSERT/UPDATE/DELETE) per SQL statement.",
+    ("statement",),
+)
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "opslog_db_lock_wait_seconds",
+    "Time spent waiting for a pooled reader, the writer, or SQLite's write lock (BEGIN IMMEDIATE).",
+    ("lock",),
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+SLOW_QUERIES = REGISTRY.counter(
+    "opslog_db_slow_queries_total",
+    "SQL statements slower than OPSLOG_SLOW_QUERY_MS.",
+    ("statement",),
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Schema changes and PRAGMAs run from migrations and pool setup; they are not
+# measured, which also keeps schema SQL out of /metrics.
+_UNLABELLED = ("CREATE", "ALTER", "DROP", "PRAGMA")
+
+_MISSING = object()
+_labels = {}
+_label_names = set()
+_labels_lock = Lock()
+_plans = {}
+_plans_lock = Lock()
+_slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+
+
+def statement_label(sql):
+    # Returns None for statements that are not measured.
+    label = _labels.get(sql, _MISSING)
+    if label is not _MISSING:
+        return label
+    text = _WHITESPACE.sub(" ", sql).strip()
+    if text[:6].upper().startswith(_UNLABELLED):
+        label = None
+    else:
+        # Variable-length IN (?, ?, ...) lists collapse to one label.
+        text = _PLACEHOLDER_LIST.sub("?+", text)
+        if len(text) > STATEMENT_LABEL_LENGTH:
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+            text = f"{text[:STATEMENT_LABEL_LENGTH]}... [{digest}]"
+        with _labels_lock:
+            if text in _label_names or len(_label_names) < MAX_STATEMENT_LABELS:
+                _label_names.add(text)
+                label = text
+            else:
+                label = OTHER_STATEMENT
+    if len(_labels) < 10000:
+        _labels[sql] = label
+    return label
+
+
+def observe_lock_wait(kind, seconds):
+    LOCK_WAIT_SECONDS.observe(seconds, lock=kind)
+
+
+def _query_plan(conn, sql, params):
+    now = time.monotonic()
+    with _plans_lock:
+        cached = _plans.get(sql)
+        if cached and cached[0] > now:
+            return cached[1]
+    if params is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        # executemany() parameters may be a consumed generator.
+        return []
+    try:
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        plan = [row[3] for row in rows]
+    except sqlite3.Error as exc:
+        plan = [f"(plan unavailable: {exc})"]
+    with _plans_lock:
+        _plans[sql] = (now + PLAN_CACHE_SECONDS, plan)
+    return plan
+
+
+def _record_slow(conn, sql, params, label, seconds, rows):
+    SLOW_QUERIES.inc(statement=label)
+    plan = _query_plan(conn, sql, params)
+    entry = {
+        "at": time.time(),
+        "ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "statement": label,
+        "plan": plan,
+    }
+    _slow_queries.append(entry)
+    slow_query_logger.warning(
+        "slow query %.1f ms, %s rows: %s | plan: %s",
+        entry["ms"], rows, label, " / ".join(plan) or "-"
+    )
+
+
+def recent_slow_queries():
+    return list(_slow_queries)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Latency runs from execute to the end of the first fetch, which is where
+    # SQLite does most of the work for the paged queries in database.py. Rows
+    # are counted on every fetch so streamed results are reported in full.
+    _pending = None
+    _label = None
+    _iterated = 0
+
+    def _finish(self, rows):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        sql, params, started = pending
+        seconds = time.perf_counter() - started
+        STATEMENT_SECONDS.observe(seconds, statement=self._label)
+        if self._label.startswith("BEGIN IMMEDIATE"):
+            observe_lock_wait("sqlite", seconds)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            _record_slow(self.connection, sql, params, self._label, seconds, rows)
+
+    def _count(self, rows):
+        self._finish(rows)
+        if rows and self._label is not None:
+            STATEMENT_ROWS.inc(rows, statement=self._label)
+
+    def _flush(self):
+        iterated, self._iterated = self._iterated, 0
+        if self._label is not None:
+            self._count(iterated)
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._label = statement_label(sql)
+        if self._label is None:
+            return self
+        self._pending = (sql, parameters, started)
+        if self.description is None:
+            self._count(max(0, self.rowcount))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._label = statement_label(sql)
+        if self._label is None:
+            return self
+        self._pending = (sql, None, started)
+        self._count(max(0, self.rowcount))
+        return self
+
+    def __next__(self):
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._flush()
+            raise
+        if self._pending is not None:
+            self._finish(1)
+        self._iterated += 1
+        return row
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._count(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
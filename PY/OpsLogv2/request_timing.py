@@ -0,0 +1,72 @@
+import contextvars
+import cProfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+
+_current = contextvars.ContextVar("opslog_request_timing", default=None)
+
+
+class RequestTiming:
+    # Shared by reference with every context copied from the request, so
+    # worker threads started through async_db.run add to the same totals.
+    def __init__(self, profile=False):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.profile = profile
+        self.profiles = []
+        self._lock = Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def get(self, phase):
+        with self._lock:
+            return self.phases.get(phase, 0.0)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def profiled(self, fn, *args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler already owns this thread.
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                self.profiles.append(profiler)
+
+
+def start(profile=False):
+    timing = RequestTiming(profile=profile)
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record(phase, seconds):
+    timing = _current.get()
+    if timing is not None:
+        timing.add(phase, seconds)
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
@@ -0,0 +1,59 @@
+import sqlite3
+
+INCIDENT = {
+    "error_name": "Disk full",
+    "component": "Storage",
+    "root_cause": "Logs",
+    "remark": "-",
+    "action_taken": "Rotated logs",
+    "start_date": "01/01/2026",
+    "start_time": "10:00 AM",
+    "end_date": "01/01/2026",
+    "end_time": "11:00 AM",
+}
+
+
+def _archived(db, month):
+    conn = sqlite3.connect(db.audit_archive_path(month))
+    try:
+        return conn.execute("SELECT action, target_id FROM audit_logs ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def _age_audit(db, created_at):
+    with db.tx(immediate=True) as conn:
+        conn.execute("UPDATE audit_logs SET created_at=?", (created_at,))
+
+
+def test_archiving_twice_keeps_tombstone_and_reservations(db):
+    incident_id = db.create_incident(dict(INCIDENT), "engineer", "Eng One")
+    reserved = db.reserve_incident_ids(2, "engineer")
+    db.request_delete_incident(incident_id, "lead", "CS Leader")
+    db.approve_delete_request(incident_id, "manager", "Manager")
+    _age_audit(db, "2025-01-15T10:00:00")
+
+    db.archive_audit_logs("2025-02")
+    first = _archived(db, "2025-01")
+    db.archive_audit_logs("2025-02")
+
+    assert _archived(db, "2025-01") == first
+    assert ("INCIDENT_DELETE_FINAL", incident_id) in first
+    assert ("INCIDENT_ID_RESERVE", reserved[0]) in first
+
+
+def test_approval_purges_archived_history_but_keeps_tombstone(db):
+    incident_id = db.create_incident(dict(INCIDENT), "engineer", "Eng One")
+    db.request_delete_incident(incident_id, "lead", "CS Leader")
+    _age_audit(db, "2025-01-15T10:00:00")
+    db.archive_audit_logs("2025-02")
+    assert ("INCIDENT_CREATE", incident_id) in _archived(db, "2025-01")
+
+    db.approve_delete_request(incident_id, "manager", "Manager")
+    _age_audit(db, "2025-01-20T10:00:00")
+    db.archive_audit_logs("2025-02")
+
+    actions = [action for action, target in _archived(db, "2025-01") if target == incident_id]
+    assert actions == ["INCIDENT_DELETE_FINAL"]
+    with db.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM audit_archive_purges").fetchone()[0] == 0
@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+
+def _login(client):
+    response = client.post("/auth/login", json={"username": "manager", "password": "Manager@123"})
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def test_if_modified_since_with_minus_zero_zone(db):
+    from app.main import app
+
+    with TestClient(app) as client:
+        headers = _login(client)
+        first = client.get("/dashboard", headers=headers)
+        assert first.status_code == 200
+        last_modified = first.headers["last-modified"]
+
+        stale = client.get("/dashboard", headers=dict(headers, **{"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 -0000"}))
+        assert stale.status_code == 200
+
+        current = last_modified.replace("GMT", "-0000")
+        fresh = client.get("/dashboard", headers=dict(headers, **{"If-Modified-Since": current}))
+        assert fresh.status_code == 304
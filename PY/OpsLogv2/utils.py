@@ -116,6 +116,27 @@ def parse_time(time_text):
     return datetime.strptime(value, TIME_FMT)
 
 
+def parse_filter_date(value):
+    if isinstance(value, datetime):
+        return datetime.combine(value.date(), datetime.min.time())
+    if hasattr(value, "isoformat"):
+        return datetime.combine(value, datetime.min.time())
+    text = normalize_text(value)
+    if re.fullmatch(r"[0-9]{4}-[0-9]{2}-[0-9]{2}", text):
+        try:
+            return datetime.strptime(text, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("Date must be in DD/MM/YYYY or YYYY-MM-DD format.")
+    try:
+        return parse_date(text)
+    except ValueError:
+        raise ValueError("Date must be in DD/MM/YYYY or YYYY-MM-DD format.")
+
+
+def to_epoch(value):
+    return int(value.timestamp())
+
+
 def calculate_duration_minutes(start_date, start_time, end_date, end_time):
     start_d = parse_date(start_date)
     start_t = parse_time(start_time)
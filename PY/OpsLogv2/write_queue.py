@@ -0,0 +1,145 @@
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+
+from metrics import REGISTRY
+
+
+WRITE_BATCH_SIZE = REGISTRY.histogram(
+    "opslog_db_write_batch_size",
+    "Write operations committed together in one group commit.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+WRITE_QUEUE_DEPTH = REGISTRY.gauge(
+    "opslog_db_write_queue_depth",
+    "Write operations queued for the group-commit writer.",
+)
+
+
+def run_in_savepoint(conn, op):
+    conn.execute("SAVEPOINT write_op")
+    try:
+        result = op(conn)
+    except BaseException:
+        conn.execute("ROLLBACK TO write_op")
+        conn.execute("RELEASE write_op")
+        raise
+    conn.execute("RELEASE write_op")
+    return result
+
+
+class WriteQueue:
+    """Single writer thread that commits queued operations in groups.
+
+    Each operation runs as ``op(conn)`` inside its own savepoint, so a failing
+    operation is rolled back without affecting the rest of its group. Results
+    are only handed back once the group's COMMIT has succeeded.
+    """
+
+    def __init__(self, pool, max_batch=64, max_wait=0.0, before_commit=None, on_abort=None):
+        self.pool = pool
+        # before_commit(conn) runs last inside each group transaction;
+        # on_abort() runs when a group is rolled back as a whole.
+        self.before_commit = before_commit
+        self.on_abort = on_abort
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self._queue = queue.Queue()
+        self._lock = Lock()
+        self._thread = None
+        self._closed = False
+        self._stats = {"operations": 0, "commits": 0, "failed_commits": 0}
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write queue is closed.")
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="opslog-db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, op):
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((op, future))
+        WRITE_QUEUE_DEPTH.inc()
+        return future
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                if self.max_wait:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this group, then stop.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        WRITE_QUEUE_DEPTH.dec(len(batch))
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._commit([(op, future) for op, future in batch if future.set_running_or_notify_cancel()])
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        done = []
+        try:
+            with self.pool.writer() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for op, future in batch:
+                    try:
+                        done.append((future, run_in_savepoint(conn, op)))
+                    except Exception as exc:
+                        if not conn.in_transaction:
+                            raise
+                        future.set_exception(exc)
+                if self.before_commit is not None:
+                    self.before_commit(conn)
+                conn.commit()
+        except BaseException as exc:
+            if self.on_abort is not None:
+                self.on_abort()
+            with self._lock:
+                self._stats["failed_commits"] += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        with self._lock:
+            self._stats["operations"] += len(batch)
+            self._stats["commits"] += 1
+        WRITE_BATCH_SIZE.observe(len(batch))
+        for future, result in done:
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data["queued"] = self._queue.qsize()
+        return data
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()